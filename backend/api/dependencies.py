@@ -21,7 +21,7 @@ def get_db():
         db.close()
 
 
-def get_current_user_id(
+async def get_current_user_id(
     authorization: Optional[str] = Header(None)
 ) -> int:
     """
@@ -39,13 +39,15 @@ def get_current_user_id(
     Note:
         Currently returns a default user ID (1) for development.
         In production, this should validate JWT tokens and return actual user ID.
+        Kept async (no blocking I/O) so FastAPI resolves it on the event loop
+        instead of dispatching it to the threadpool on every request.
     """
     # TODO: Implement JWT token validation
     # For now, return default user ID for development
     return 1
 
 
-def verify_api_key(
+async def verify_api_key(
     x_api_key: Optional[str] = Header(None)
 ) -> bool:
     """
@@ -68,7 +70,7 @@ def verify_api_key(
     return True
 
 
-def get_pagination_params(
+async def get_pagination_params(
     skip: int = 0,
     limit: int = 100
 ) -> dict:
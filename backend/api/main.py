@@ -1,37 +1,56 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
 from datetime import datetime
 
 from backend.config.settings import settings
-from backend.models.database import engine, get_db, init_db, Base
+from backend.models.database import engine, get_db, init_db
 from backend.models import tables
+from backend.utils.cache import category_cache
 from backend.api.routes import expenses, upload, analytics, predictions
 
+# Create data, model and log directories once per process
+settings.ensure_dirs()
+
 # Configure logging
+# Request threads only enqueue records; a background listener thread
+# formats them and writes to the log file and the console.
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+file_handler = logging.FileHandler(settings.log_file)
+file_handler.setFormatter(log_formatter)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(log_formatter)
+
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, file_handler, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# The queue handler only merges the message arguments; layout is applied
+# by the listener's handlers
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
 logging.basicConfig(
     level=getattr(logging, settings.log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(settings.log_file),
-        logging.StreamHandler()
-    ]
+    handlers=[queue_handler]
 )
 
 logger = logging.getLogger(__name__)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
 # Create FastAPI application
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="API for intelligent personal expense management",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -52,36 +71,57 @@ async def startup_event():
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Database: {settings.database_url}")
     
-    # Initialize database
-    try:
-        init_db()
-        logger.info("✅ Database initialized")
-    except Exception as e:
-        logger.error(f"❌ Error initializing database: {e}")
+    # Initialize database (disable with AUTO_CREATE_SCHEMA=false when the
+    # schema is managed separately)
+    if settings.auto_create_schema:
+        try:
+            if init_db():
+                logger.info("✅ Database initialized")
+            else:
+                logger.info("Database schema is being created by another worker")
+        except Exception as e:
+            logger.error(f"❌ Error initializing database: {e}")
     
-    # Populate categories if they don't exist
+    # Populate the default user and categories if they don't exist (existing
+    # rows are skipped). Routes still write expenses as user 1, so that row
+    # must exist once foreign keys are enforced.
     from backend.config.constants import EXPENSE_CATEGORIES
     db = next(get_db())
     try:
-        for slug, info in EXPENSE_CATEGORIES.items():
-            existing = db.query(tables.Category).filter(
-                tables.Category.slug == slug
-            ).first()
-            
-            if not existing:
-                category = tables.Category(
-                    name=info["name"],
-                    slug=slug,
-                    color=info["color"],
-                    icon=info["icon"],
-                    keywords=info["keywords"]
-                )
-                db.add(category)
+        rows = [
+            {
+                "name": info["name"],
+                "slug": slug,
+                "color": info["color"],
+                "icon": info["icon"],
+                "keywords": info["keywords"]
+            }
+            for slug, info in EXPENSE_CATEGORIES.items()
+        ]
+        
+        if db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
         
+        db.execute(
+            insert(tables.User).values(
+                id=1,
+                email="demo@example.com",
+                name="Demo User",
+                hashed_password="hashed_password_here",  # TODO: Real authentication
+                is_active=True
+            ).on_conflict_do_nothing()
+        )
+        stmt = insert(tables.Category).values(rows).on_conflict_do_nothing(
+            index_elements=["slug"]
+        )
+        db.execute(stmt)
         db.commit()
-        logger.info("✅ Categories initialized")
+        category_cache.load(db)
+        logger.info("✅ Default user and categories initialized")
     except Exception as e:
-        logger.error(f"Error initializing categories: {e}")
+        logger.error(f"Error initializing default user and categories: {e}")
         db.rollback()
     finally:
         db.close()
@@ -101,28 +141,46 @@ async def root():
         "app": settings.app_name,
         "version": settings.app_version,
         "status": "running",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.now(),
         "docs": "/docs",
         "redoc": "/redoc"
     }
 
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """Health check endpoint"""
+async def health_check():
+    """
+    Liveness check endpoint
+    
+    Does not check out a pooled connection, so frequent probes cannot
+    starve request handlers. Use /ready to verify the database.
+    """
+    return {
+        "status": "healthy",
+        "database": engine.pool.status(),
+        "timestamp": datetime.now()
+    }
+
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness check endpoint (verifies the database connection)"""
     try:
-        # Check database connection
-        db.execute("SELECT 1")
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
-        logger.error(f"Database health check failed: {e}")
+        logger.error(f"Database readiness check failed: {e}")
         db_status = "unhealthy"
     
-    return {
-        "status": "healthy" if db_status == "healthy" else "unhealthy",
-        "database": db_status,
-        "timestamp": datetime.now().isoformat()
-    }
+    return ORJSONResponse(
+        status_code=200 if db_status == "healthy" else 503,
+        content={
+            "status": "ready" if db_status == "healthy" else "not_ready",
+            "database": db_status,
+            "timestamp": datetime.now()
+        }
+    )
 
 
 # Include routers
@@ -155,7 +213,7 @@ app.include_router(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """HTTP exception handler"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -169,7 +227,7 @@ async def http_exception_handler(request, exc):
 async def general_exception_handler(request, exc):
     """General exception handler"""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -1,21 +1,41 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
-from datetime import datetime, timedelta
+from sqlalchemy import func, and_, or_, case
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
 from typing import Optional, List
+import numpy as np
 import logging
 
 from backend.models.database import get_db
 from backend.models import tables, schemas
 from backend.services.analytics_service import analytics_service
+from backend.utils.cache import cached, analytics_namespace
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _default_range(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    months: int = 1
+):
+    """
+    Completa un rango de fechas: por defecto los últimos `months` meses
+    
+    Usa meses de calendario (relativedelta) en lugar de bloques de 30 días.
+    """
+    if not end_date:
+        end_date = datetime.now()
+    if not start_date:
+        start_date = end_date - relativedelta(months=months)
+    return start_date, end_date
+
+
 @router.get("/summary")
-async def get_summary(
+def get_summary(
     period: str = Query("month", regex="^(week|month|quarter|year|all)$"),
     category_id: Optional[int] = None,
     db: Session = Depends(get_db)
@@ -23,6 +43,9 @@ async def get_summary(
     """
     Obtiene un resumen de gastos para un período
     
+    El resultado ya lo cachea el servicio (por usuario y minuto), así que
+    la ruta no añade otra capa de caché.
+    
     Args:
         period: week, month, quarter, year, all
         category_id: Filtrar por categoría (opcional)
@@ -36,7 +59,8 @@ async def get_summary(
 
 
 @router.get("/by-category")
-async def get_expenses_by_category(
+@cached(analytics_namespace(1))  # TODO: user_id del token
+def get_expenses_by_category(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
@@ -45,10 +69,7 @@ async def get_expenses_by_category(
     Agrupa gastos por categoría
     """
     # Fechas por defecto: último mes
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _default_range(start_date, end_date)
     
     query = db.query(
         tables.Category.id,
@@ -72,21 +93,31 @@ async def get_expenses_by_category(
         func.sum(tables.Expense.amount).desc()
     ).all()
     
-    # Calcular total general para porcentajes
-    total_general = sum([r.total for r in query])
+    # Totales y promedios como arrays para calcular porcentajes en una pasada
+    totals = np.fromiter((r.total for r in query), dtype=np.float64, count=len(query))
+    averages = np.fromiter((r.average for r in query), dtype=np.float64, count=len(query))
+    total_general = float(totals.sum())
     
-    results = []
-    for row in query:
-        results.append({
+    if total_general > 0:
+        percentages = totals / total_general * 100
+    else:
+        percentages = np.zeros_like(totals)
+    
+    results = [
+        {
             "category_id": row.id,
             "category_name": row.name,
             "icon": row.icon,
             "color": row.color,
-            "total_amount": float(row.total),
+            "total_amount": total,
             "transaction_count": row.count,
-            "average_amount": float(row.average),
-            "percentage": (float(row.total) / total_general * 100) if total_general > 0 else 0
-        })
+            "average_amount": average,
+            "percentage": percentage
+        }
+        for row, total, average, percentage in zip(
+            query, totals.tolist(), averages.tolist(), percentages.tolist()
+        )
+    ]
     
     return {
         "categories": results,
@@ -99,7 +130,7 @@ async def get_expenses_by_category(
 
 
 @router.get("/trends")
-async def get_trends(
+def get_trends(
     period: str = Query("month", regex="^(week|month|year)$"),
     group_by: str = Query("day", regex="^(day|week|month)$"),
     category_id: Optional[int] = None,
@@ -118,7 +149,7 @@ async def get_trends(
 
 
 @router.get("/top-merchants")
-async def get_top_merchants(
+def get_top_merchants(
     limit: int = Query(10, le=50),
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
@@ -127,10 +158,7 @@ async def get_top_merchants(
     """
     Obtiene los comercios donde más se gasta
     """
-    if not end_date:
-        end_date = datetime.now()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    start_date, end_date = _default_range(start_date, end_date)
     
     query = db.query(
         tables.Expense.merchant,
@@ -162,30 +190,49 @@ async def get_top_merchants(
 
 
 @router.get("/monthly-comparison")
-async def get_monthly_comparison(
+@cached(analytics_namespace(1))  # TODO: user_id del token
+def get_monthly_comparison(
     months: int = Query(6, ge=2, le=12),
     db: Session = Depends(get_db)
 ):
     """
     Compara gastos mes a mes
     """
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=months * 30)
+    user_id = 1  # TODO: Del token
+    
+    # Meses cerrados desde la tabla precalculada, el resto en vivo
+    current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start_month = current_month - relativedelta(months=months)
     
     query = db.query(
-        extract('year', tables.Expense.date).label('year'),
-        extract('month', tables.Expense.date).label('month'),
-        func.sum(tables.Expense.amount).label('total'),
-        func.count(tables.Expense.id).label('count')
+        tables.MonthlySummary.year,
+        tables.MonthlySummary.month,
+        tables.MonthlySummary.total,
+        tables.MonthlySummary.count
     ).filter(
-        and_(
-            tables.Expense.user_id == 1,
-            tables.Expense.date >= start_date
+        tables.MonthlySummary.user_id == user_id,
+        or_(
+            tables.MonthlySummary.year > start_month.year,
+            and_(
+                tables.MonthlySummary.year == start_month.year,
+                tables.MonthlySummary.month >= start_month.month
+            )
         )
-    ).group_by(
-        'year', 'month'
     ).order_by(
-        'year', 'month'
+        tables.MonthlySummary.year,
+        tables.MonthlySummary.month
+    ).all()
+    
+    # El resumen es un prefijo contiguo de meses cerrados (las escrituras
+    # invalidan desde el mes afectado): se agrega en vivo desde el mes
+    # siguiente a la última fila, o todo el rango si no hay resumen
+    if query:
+        last = query[-1]
+        live_start = datetime(int(last.year), int(last.month), 1) + relativedelta(months=1)
+    else:
+        live_start = start_month
+    query += analytics_service.monthly_totals_query(
+        db, live_start, user_id=user_id
     ).all()
     
     results = []
@@ -203,7 +250,7 @@ async def get_monthly_comparison(
 
 
 @router.get("/anomalies")
-async def detect_anomalies(
+def detect_anomalies(
     threshold: float = Query(3.0, ge=1.0, le=5.0),
     db: Session = Depends(get_db)
 ):
@@ -218,7 +265,7 @@ async def detect_anomalies(
 
 
 @router.get("/budget-status")
-async def get_budget_status(
+def get_budget_status(
     month: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
@@ -228,8 +275,34 @@ async def get_budget_status(
     if not month:
         month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    # Obtener presupuestos del mes
-    budgets = db.query(tables.Budget).filter(
+    # Rango semiabierto [inicio de mes, inicio del mes siguiente) para usar el índice por fecha
+    month_start = month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month_start = month_start + relativedelta(months=1)
+    
+    # Gasto del mes agregado por categoría (una sola pasada sobre expenses)
+    spent_sq = db.query(
+        tables.Expense.category_id,
+        func.sum(tables.Expense.amount).label("spent")
+    ).filter(
+        and_(
+            tables.Expense.user_id == 1,
+            tables.Expense.date >= month_start,
+            tables.Expense.date < next_month_start
+        )
+    ).group_by(
+        tables.Expense.category_id
+    ).subquery()
+    
+    # Presupuestos del mes con su categoría y gasto en una única consulta
+    rows = db.query(
+        tables.Budget,
+        tables.Category.name,
+        func.coalesce(spent_sq.c.spent, 0.0).label("spent")
+    ).join(
+        tables.Category, tables.Budget.category_id == tables.Category.id
+    ).outerjoin(
+        spent_sq, spent_sq.c.category_id == tables.Budget.category_id
+    ).filter(
         and_(
             tables.Budget.user_id == 1,
             tables.Budget.month == month
@@ -237,25 +310,13 @@ async def get_budget_status(
     ).all()
     
     results = []
-    for budget in budgets:
-        # Calcular gasto actual en la categoría
-        spent = db.query(
-            func.sum(tables.Expense.amount)
-        ).filter(
-            and_(
-                tables.Expense.user_id == 1,
-                tables.Expense.category_id == budget.category_id,
-                extract('year', tables.Expense.date) == month.year,
-                extract('month', tables.Expense.date) == month.month
-            )
-        ).scalar() or 0.0
-        
+    for budget, category_name, spent in rows:
         percentage = (spent / budget.amount_limit * 100) if budget.amount_limit > 0 else 0
         
         results.append({
             "budget_id": budget.id,
             "category_id": budget.category_id,
-            "category_name": budget.category.name,
+            "category_name": category_name,
             "budget_limit": budget.amount_limit,
             "current_spent": spent,
             "remaining": budget.amount_limit - spent,
@@ -272,7 +333,8 @@ async def get_budget_status(
 
 
 @router.get("/statistics")
-async def get_statistics(
+@cached(analytics_namespace(1))  # TODO: user_id del token
+def get_statistics(
     db: Session = Depends(get_db)
 ):
     """
@@ -280,33 +342,21 @@ async def get_statistics(
     """
     user_id = 1  # TODO: Del token
     
-    # Total de gastos
-    total_expenses = db.query(
-        func.count(tables.Expense.id)
-    ).filter(
-        tables.Expense.user_id == user_id
-    ).scalar()
-    
-    # Suma total
-    total_amount = db.query(
-        func.sum(tables.Expense.amount)
-    ).filter(
-        tables.Expense.user_id == user_id
-    ).scalar() or 0.0
-    
-    # Promedio por gasto
-    avg_expense = db.query(
-        func.avg(tables.Expense.amount)
-    ).filter(
-        tables.Expense.user_id == user_id
-    ).scalar() or 0.0
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    # Gasto más alto
-    max_expense = db.query(
-        func.max(tables.Expense.amount)
+    # Totales, promedio, máximo y gasto de este mes en una sola consulta
+    totals = db.query(
+        func.count(tables.Expense.id).label('count'),
+        func.coalesce(func.sum(tables.Expense.amount), 0.0).label('total'),
+        func.coalesce(func.avg(tables.Expense.amount), 0.0).label('average'),
+        func.coalesce(func.max(tables.Expense.amount), 0.0).label('max'),
+        func.coalesce(func.sum(
+            case((tables.Expense.date >= month_start, tables.Expense.amount), else_=0)
+        ), 0.0).label('this_month')
     ).filter(
         tables.Expense.user_id == user_id
-    ).scalar() or 0.0
+    ).one()
     
     # Categoría favorita
     favorite_category = db.query(
@@ -322,24 +372,11 @@ async def get_statistics(
         func.count(tables.Expense.id).desc()
     ).first()
     
-    # Gastos este mes
-    now = datetime.now()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    this_month_total = db.query(
-        func.sum(tables.Expense.amount)
-    ).filter(
-        and_(
-            tables.Expense.user_id == user_id,
-            tables.Expense.date >= month_start
-        )
-    ).scalar() or 0.0
-    
     return {
-        "total_expenses": total_expenses,
-        "total_amount": float(total_amount),
-        "average_expense": float(avg_expense),
-        "max_expense": float(max_expense),
+        "total_expenses": totals.count,
+        "total_amount": float(totals.total),
+        "average_expense": float(totals.average),
+        "max_expense": float(totals.max),
         "favorite_category": favorite_category.name if favorite_category else None,
-        "this_month_total": float(this_month_total)
+        "this_month_total": float(totals.this_month)
     }
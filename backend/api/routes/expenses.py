@@ -1,18 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload, joinedload
 from sqlalchemy import and_, or_, desc, func
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime, timedelta
 import logging
+import orjson
 
-from backend.models.database import get_db
+from backend.models.database import get_db, SessionLocal
 from backend.models import tables, schemas
+from backend.utils.cache import response_cache, analytics_namespace
+from backend.services.analytics_service import analytics_service
 from backend.config.constants import SUCCESS_MESSAGES, ERROR_MESSAGES
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 200
+
+
+def _missing_reference(db: Session, expense: tables.Expense) -> Optional[str]:
+    """
+    Finds which foreign key of a rejected expense points nowhere
+    
+    Only called after an IntegrityError, so the happy path does not pay
+    for the lookups.
+    
+    Returns:
+        Error detail for the missing row, or None if both exist
+    """
+    if db.get(tables.Category, expense.category_id) is None:
+        return "Category not found"
+    if db.get(tables.User, expense.user_id) is None:
+        return "User not found"
+    return None
+
 
 @router.post("/", response_model=schemas.ExpenseInDB, status_code=status.HTTP_201_CREATED)
 def create_expense(
@@ -21,28 +46,27 @@ def create_expense(
 ):
     """Creates a new expense"""
     try:
-        # Validate that the category exists
-        category = db.query(tables.Category).filter(
-            tables.Category.id == expense.category_id
-        ).first()
-        
-        if not category:
-            raise HTTPException(
-                status_code=404,
-                detail="Category not found"
-            )
-        
-        # Create expense
+        # Create expense (the category and user foreign keys are checked on insert)
         db_expense = tables.Expense(
             **expense.model_dump(exclude={"user_id"}),
             user_id=1  # TODO: Get from authentication token
         )
         
+        analytics_service.invalidate_monthly_summary(db, 1, db_expense.date)
         db.add(db_expense)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            detail = _missing_reference(db, db_expense)
+            if detail is None:
+                raise
+            raise HTTPException(status_code=404, detail=detail)
         db.refresh(db_expense)
+        response_cache.clear(analytics_namespace(1))
         
-        logger.info(f"Expense created: ID {db_expense.id}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Expense created: ID %d", db_expense.id)
         
         return db_expense
         
@@ -50,17 +74,71 @@ def create_expense(
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error creating expense: {e}")
+        logger.error("Error creating expense: %s", e)
         raise HTTPException(
             status_code=500,
             detail=ERROR_MESSAGES["database_error"]
         )
 
 
+def _apply_filters(
+    query,
+    category_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    search: Optional[str] = None
+):
+    """Applies the optional expense list filters to a query"""
+    if category_id:
+        query = query.filter(tables.Expense.category_id == category_id)
+    
+    if start_date:
+        query = query.filter(tables.Expense.date >= start_date)
+    
+    if end_date:
+        query = query.filter(tables.Expense.date <= end_date)
+    
+    if min_amount:
+        query = query.filter(tables.Expense.amount >= min_amount)
+    
+    if max_amount:
+        query = query.filter(tables.Expense.amount <= max_amount)
+    
+    if search:
+        search_filter = or_(
+            tables.Expense.merchant.ilike(f"%{search}%"),
+            tables.Expense.description.ilike(f"%{search}%")
+        )
+        query = query.filter(search_filter)
+    
+    return query
+
+
+def _parse_cursor(cursor: str):
+    """
+    Parses a pagination cursor in the form "<iso date>|<id>"
+    
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        cursor_date, cursor_id = cursor.split("|")
+        return datetime.fromisoformat(cursor_date), int(cursor_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid pagination cursor"
+        )
+
+
 @router.get("/", response_model=List[schemas.ExpenseInDB])
 def get_expenses(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
     category_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
@@ -71,53 +149,109 @@ def get_expenses(
 ):
     """
     Retrieves a list of expenses with optional filters
+    
+    Pages can be walked with `cursor` (keyset pagination on date and id)
+    instead of `skip`; the cursor for the next page is returned in the
+    X-Next-Cursor header when more results may follow.
     """
     try:
-        # Base Query
-        query = db.query(tables.Expense).filter(
+        # Base Query (categories are loaded in one extra query, not per row)
+        query = db.query(tables.Expense).options(
+            selectinload(tables.Expense.category)
+        ).filter(
             tables.Expense.user_id == 1  # TODO: From token
         )
         
         # Apply filters
-        if category_id:
-            query = query.filter(tables.Expense.category_id == category_id)
-        
-        if start_date:
-            query = query.filter(tables.Expense.date >= start_date)
-        
-        if end_date:
-            query = query.filter(tables.Expense.date <= end_date)
+        query = _apply_filters(
+            query, category_id, start_date, end_date, min_amount, max_amount, search
+        )
         
-        if min_amount:
-            query = query.filter(tables.Expense.amount >= min_amount)
+        # Keyset pagination: continue after the last row of the previous page
+        if cursor:
+            cursor_date, cursor_id = _parse_cursor(cursor)
+            query = query.filter(
+                or_(
+                    tables.Expense.date < cursor_date,
+                    and_(
+                        tables.Expense.date == cursor_date,
+                        tables.Expense.id < cursor_id
+                    )
+                )
+            )
         
-        if max_amount:
-            query = query.filter(tables.Expense.amount <= max_amount)
+        # Order by descending date (id breaks ties so pages are stable)
+        query = query.order_by(desc(tables.Expense.date), desc(tables.Expense.id))
         
-        if search:
-            search_filter = or_(
-                tables.Expense.merchant.ilike(f"%{search}%"),
-                tables.Expense.description.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+        # Pagination (offset only without a cursor, and after order_by)
+        if skip and not cursor:
+            query = query.offset(skip)
         
-        # Order by descending date
-        query = query.order_by(desc(tables.Expense.date))
+        expenses = query.limit(limit).all()
         
-        # Pagination
-        expenses = query.offset(skip).limit(limit).all()
+        if len(expenses) == limit:
+            last = expenses[-1]
+            response.headers["X-Next-Cursor"] = f"{last.date.isoformat()}|{last.id}"
         
         return expenses
         
+    except HTTPException:
+        raise
+        
     except Exception as e:
-        logger.error(f"Error retrieving expenses: {e}")
+        logger.error("Error retrieving expenses: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/export")
+def export_expenses(
+    category_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    search: Optional[str] = None
+):
+    """
+    Streams all matching expenses as a JSON array
+    
+    Rows are fetched and serialized in batches, so memory use does not
+    grow with the number of expenses exported.
+    """
+    def generate():
+        # The request-scoped session is closed before streaming starts,
+        # so the generator owns its own session
+        db = SessionLocal()
+        try:
+            query = db.query(tables.Expense).options(
+                selectinload(tables.Expense.category)
+            ).filter(
+                tables.Expense.user_id == 1  # TODO: From token
+            )
+            query = _apply_filters(
+                query, category_id, start_date, end_date, min_amount, max_amount, search
+            )
+            query = query.order_by(desc(tables.Expense.date), desc(tables.Expense.id))
+            
+            yield b"["
+            first = True
+            for expense in query.yield_per(EXPORT_BATCH_SIZE):
+                item = orjson.dumps(schemas.ExpenseInDB.model_validate(expense).model_dump())
+                yield item if first else b"," + item
+                first = False
+            yield b"]"
+        finally:
+            db.close()
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+
 @router.get("/{expense_id}", response_model=schemas.ExpenseInDB)
 def get_expense(expense_id: int, db: Session = Depends(get_db)):
     """Retrieves a specific expense by ID"""
-    expense = db.query(tables.Expense).filter(
+    expense = db.query(tables.Expense).options(
+        joinedload(tables.Expense.category)
+    ).filter(
         and_(
             tables.Expense.id == expense_id,
             tables.Expense.user_id == 1  # TODO: From token
@@ -141,7 +275,10 @@ def update_expense(
 ):
     """Updates an existing expense"""
     try:
-        db_expense = db.query(tables.Expense).filter(
+        # The category is serialized in the response: load it in the same query
+        db_expense = db.query(tables.Expense).options(
+            joinedload(tables.Expense.category)
+        ).filter(
             and_(
                 tables.Expense.id == expense_id,
                 tables.Expense.user_id == 1  # TODO: From token
@@ -155,14 +292,21 @@ def update_expense(
             )
         
         # Update fields
+        previous_date = db_expense.date
         update_data = expense_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_expense, field, value)
         
+        # Both the previous and the new month of the expense change
+        analytics_service.invalidate_monthly_summary(
+            db, 1, min(previous_date, db_expense.date, key=lambda d: (d.year, d.month))
+        )
         db.commit()
         db.refresh(db_expense)
+        response_cache.clear(analytics_namespace(1))
         
-        logger.info(f"Expense updated: ID {expense_id}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Expense updated: ID %d", expense_id)
         
         return db_expense
         
@@ -170,7 +314,7 @@ def update_expense(
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error updating expense: {e}")
+        logger.error("Error updating expense: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -192,9 +336,12 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db)):
             )
         
         db.delete(db_expense)
+        analytics_service.invalidate_monthly_summary(db, 1, db_expense.date)
         db.commit()
+        response_cache.clear(analytics_namespace(1))
         
-        logger.info(f"Expense deleted: ID {expense_id}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Expense deleted: ID %d", expense_id)
         
         return {
             "success": True,
@@ -205,7 +352,7 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error deleting expense: {e}")
+        logger.error("Error deleting expense: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -219,7 +366,7 @@ def get_total_expenses(
     """Retrieves the total expenses with optional filters"""
     
     query = db.query(
-        func.sum(tables.Expense.amount).label("total"),
+        func.coalesce(func.sum(tables.Expense.amount), 0.0).label("total"),
         func.count(tables.Expense.id).label("count")
     ).filter(tables.Expense.user_id == 1)
     
@@ -232,10 +379,10 @@ def get_total_expenses(
     if category_id:
         query = query.filter(tables.Expense.category_id == category_id)
     
-    result = query.first()
+    result = query.one()
     
     return {
-        "total_amount": float(result.total) if result.total else 0.0,
+        "total_amount": float(result.total),
         "total_count": result.count,
         "filters": {
             "start_date": start_date,
@@ -2,23 +2,160 @@
 Prediction endpoints for forecasting future expenses
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import func
+from typing import Optional, Tuple
 import logging
 import pandas as pd
+import numpy as np
 
 from backend.models.database import get_db
 from backend.models import tables
 from backend.services.prediction_service import prediction_service
+from backend.services.analytics_service import analytics_service
 from backend.api.dependencies import get_current_user_id
+from backend.utils.cache import (
+    response_cache, analytics_namespace, cached, user_analytics_namespace
+)
+from backend.utils.numeric import _linreg_fit, _forecast, _rmse, _r_squared
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Accuracy results are keyed by a data fingerprint, so they can live long
+ACCURACY_CACHE_TTL = 3600
+
+# Columns that can be loaded into prediction DataFrames
+EXPENSE_COLUMNS = {
+    'date': tables.Expense.date,
+    'amount': tables.Expense.amount,
+    'category': tables.Category.slug,
+    'category_name': tables.Category.name
+}
+
+# Rows fetched per round-trip when streaming expenses
+STREAM_BATCH_SIZE = 10_000
+
+
+def _load_expenses_df(
+    db: Session,
+    user_id: int,
+    columns: Tuple[str, ...] = ('date', 'amount'),
+    category_id: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Load a user's expenses as a DataFrame with a single query
+    
+    Only the requested columns are selected, so no ORM objects are built
+    and categories are joined in SQL instead of lazy-loaded per row.
+    Rows are streamed in batches of STREAM_BATCH_SIZE.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        columns: Names from EXPENSE_COLUMNS to select
+        category_id: Optional category filter
+        
+    Returns:
+        DataFrame with one row per expense
+    """
+    query = db.query(*[EXPENSE_COLUMNS[column] for column in columns])
+    
+    if any(column.startswith('category') for column in columns):
+        query = query.join(
+            tables.Category,
+            tables.Expense.category_id == tables.Category.id
+        )
+    
+    query = query.filter(tables.Expense.user_id == user_id)
+    
+    if category_id:
+        query = query.filter(tables.Expense.category_id == category_id)
+    
+    # Build one frame per streamed batch, so only one batch of rows is held
+    # as Python tuples at a time
+    result = db.execute(
+        query.statement,
+        execution_options={"yield_per": STREAM_BATCH_SIZE}
+    )
+    frames = [
+        pd.DataFrame.from_records(partition, columns=list(columns))
+        for partition in result.partitions()
+    ]
+    
+    if not frames:
+        return pd.DataFrame(columns=list(columns))
+    
+    return pd.concat(frames, ignore_index=True)
+
+
+def _load_expense_arrays(
+    db: Session,
+    user_id: int,
+    category_id: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load a user's expense dates and amounts as NumPy arrays, oldest first
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        category_id: Optional category filter
+        
+    Returns:
+        Tuple (dates as datetime64[D], amounts as float64)
+    """
+    query = db.query(tables.Expense.date, tables.Expense.amount).filter(
+        tables.Expense.user_id == user_id
+    )
+    
+    if category_id:
+        query = query.filter(tables.Expense.category_id == category_id)
+    
+    rows = query.order_by(tables.Expense.date).all()
+    
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    amounts = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return dates, amounts
+
+
+@cached(user_analytics_namespace)
+async def _forecast_payload(
+    periods: int,
+    category_id: Optional[int],
+    db: Session,
+    user_id: int
+) -> dict:
+    """Forecast payload of the /forecast endpoint, cached per user"""
+    # Fetch historical expenses (filtered by category if specified)
+    df = await run_in_threadpool(
+        _load_expenses_df, db, user_id, ('date', 'amount', 'category'), category_id
+    )
+    
+    if df.empty:
+        return {
+            "success": False,
+            "message": "No expense data found for prediction",
+            "predictions": []
+        }
+    
+    # Category filter if specified (the joined slug is on every row)
+    category = df['category'].iat[0] if category_id else None
+    
+    # Generate predictions
+    return await run_in_threadpool(
+        prediction_service.predict_future_expenses,
+        df,
+        periods=periods,
+        category=category
+    )
 
 
 @router.get("/forecast")
-def get_expense_forecast(
+async def get_expense_forecast(
     periods: int = Query(3, ge=1, le=12, description="Number of months to forecast"),
     category_id: Optional[int] = Query(None, description="Category to filter by"),
     db: Session = Depends(get_db),
@@ -37,50 +174,14 @@ def get_expense_forecast(
         Predictions with confidence intervals
     """
     try:
-        # Fetch historical expenses
-        query = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
-        )
-        
-        # Filter by category if specified
-        if category_id:
-            query = query.filter(tables.Expense.category_id == category_id)
-        
-        expenses = query.all()
-        
-        if not expenses:
-            return {
-                "success": False,
-                "message": "No expense data found for prediction",
-                "predictions": []
-            }
-        
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount,
-            'category': exp.category.slug
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        
-        # Get category filter if specified
-        category = None
-        if category_id:
-            cat = db.query(tables.Category).filter(
-                tables.Category.id == category_id
-            ).first()
-            if cat:
-                category = cat.slug
-        
-        # Generate predictions
-        predictions = prediction_service.predict_future_expenses(
-            df,
-            periods=periods,
-            category=category
+        predictions = await _forecast_payload(
+            periods=periods, category_id=category_id, db=db, user_id=user_id
         )
         
-        return predictions
+        # Returned as a response so the payload goes straight to orjson
+        # (NumPy values included) instead of through jsonable_encoder; the
+        # cache holds the plain payload, so each request gets its own response
+        return ORJSONResponse(predictions)
         
     except Exception as e:
         logger.error(f"Error generating forecast: {e}")
@@ -88,7 +189,7 @@ def get_expense_forecast(
 
 
 @router.get("/forecast/by-category")
-def get_forecast_by_category(
+async def get_forecast_by_category(
     periods: int = Query(3, ge=1, le=12),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
@@ -106,38 +207,29 @@ def get_forecast_by_category(
     """
     try:
         # Fetch all expenses
-        expenses = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
-        ).all()
+        df = await run_in_threadpool(
+            _load_expenses_df, db, user_id, ('date', 'amount', 'category', 'category_name')
+        )
         
-        if not expenses:
+        if df.empty:
             return {
                 "success": False,
                 "message": "No expense data found",
                 "predictions": {}
             }
         
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount,
-            'category': exp.category.slug,
-            'category_name': exp.category.name
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        
         # Generate predictions by category
-        predictions_by_cat = prediction_service.predict_by_category(
+        predictions_by_cat = await run_in_threadpool(
+            prediction_service.predict_by_category,
             df,
             periods=periods
         )
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "periods": periods,
             "predictions": predictions_by_cat
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error generating category forecast: {e}")
@@ -145,7 +237,8 @@ def get_forecast_by_category(
 
 
 @router.get("/trend")
-def get_spending_trend(
+@cached(user_analytics_namespace)
+async def get_spending_trend(
     category_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
@@ -163,31 +256,20 @@ def get_spending_trend(
     """
     try:
         # Fetch expenses
-        query = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
+        dates, amounts = await run_in_threadpool(
+            _load_expense_arrays, db, user_id, category_id
         )
         
-        if category_id:
-            query = query.filter(tables.Expense.category_id == category_id)
-        
-        expenses = query.all()
-        
-        if len(expenses) < 2:
+        if len(amounts) < 2:
             return {
                 "trend": "insufficient_data",
                 "message": "Need at least 2 expenses to detect trend"
             }
         
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        
         # Detect trend
-        trend_info = prediction_service.detect_trend(df)
+        trend_info = await run_in_threadpool(
+            prediction_service.detect_trend_arrays, dates, amounts
+        )
         
         return trend_info
         
@@ -197,7 +279,7 @@ def get_spending_trend(
 
 
 @router.post("/train")
-def train_prediction_model(
+async def train_prediction_model(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -213,32 +295,23 @@ def train_prediction_model(
     """
     try:
         # Fetch all user expenses
-        expenses = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
-        ).all()
+        df = await run_in_threadpool(
+            _load_expenses_df, db, user_id, ('date', 'amount', 'category')
+        )
         
-        if not expenses:
+        if df.empty:
             raise HTTPException(
                 status_code=400,
                 detail="No expense data available for training"
             )
         
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount,
-            'category': exp.category.slug
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        
         # Train model
-        prediction_service.train_with_data(df)
+        await run_in_threadpool(prediction_service.train_with_data, df)
         
         return {
             "success": True,
             "message": "Model trained successfully",
-            "training_samples": len(expenses)
+            "training_samples": len(df)
         }
         
     except HTTPException:
@@ -248,8 +321,84 @@ def train_prediction_model(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _expenses_fingerprint(db: Session, user_id: int) -> tuple:
+    """
+    Cheap fingerprint of a user's expenses that changes on every write
+    
+    Returns:
+        Tuple (count, max id, last update)
+    """
+    return tuple(db.query(
+        func.count(tables.Expense.id),
+        func.max(tables.Expense.id),
+        func.max(tables.Expense.updated_at)
+    ).filter(
+        tables.Expense.user_id == user_id
+    ).one())
+
+
+def _calculate_accuracy(db: Session, user_id: int) -> dict:
+    """
+    Fit the trend model on monthly totals and report its accuracy
+    
+    Monthly totals are aggregated in SQL; months without expenses count
+    as zero so the time axis has no gaps.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        
+    Returns:
+        Accuracy response payload
+    """
+    rows = analytics_service.monthly_totals_query(db, user_id=user_id).all()
+    
+    if not rows:
+        return {
+            "success": False,
+            "message": "No data available"
+        }
+    
+    # Month offsets from the first month with expenses
+    month_index = np.fromiter(
+        (int(row.year) * 12 + int(row.month) for row in rows),
+        dtype=np.int64,
+        count=len(rows)
+    )
+    month_index -= month_index[0]
+    
+    y = np.zeros(month_index[-1] + 1, dtype=np.float64)
+    y[month_index] = np.fromiter((row.total for row in rows), dtype=np.float64, count=len(rows))
+    
+    if len(y) < 3:
+        return {
+            "success": False,
+            "message": "Insufficient data for accuracy calculation"
+        }
+    
+    x = np.arange(len(y), dtype=np.float64)
+    
+    # Fit the trend line (the shared prediction model is left untouched)
+    slope, intercept = _linreg_fit(x, y)
+    predictions = _forecast(slope, intercept, len(y))
+    
+    # Calculate R² and RMSE
+    r_squared = _r_squared(y, predictions)
+    rmse = _rmse(y, predictions)
+    
+    return {
+        "success": True,
+        "metrics": {
+            "r_squared": float(r_squared),
+            "rmse": float(rmse),
+            "training_samples": len(y),
+            "model_type": "Linear Regression"
+        }
+    }
+
+
 @router.get("/accuracy")
-def get_model_accuracy(
+async def get_model_accuracy(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -264,70 +413,52 @@ def get_model_accuracy(
         Model accuracy information
     """
     try:
-        # Fetch expenses
-        expenses = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
-        ).all()
-        
-        if not expenses:
-            return {
-                "success": False,
-                "message": "No data available"
-            }
-        
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Get monthly aggregation
-        monthly_data = df.groupby(
-            pd.Grouper(key='date', freq='M')
-        )['amount'].sum().reset_index()
-        
-        if len(monthly_data) < 3:
-            return {
-                "success": False,
-                "message": "Insufficient data for accuracy calculation"
-            }
-        
-        # Simple accuracy calculation
-        import numpy as np
-        monthly_data['month_num'] = range(len(monthly_data))
-        X = monthly_data[['month_num']].values
-        y = monthly_data['amount'].values
-        
-        # Fit model
-        prediction_service.model.fit(X, y)
-        predictions = prediction_service.model.predict(X)
-        
-        # Calculate R²
-        r_squared = prediction_service.model.score(X, y)
-        
-        # Calculate RMSE
-        rmse = np.sqrt(np.mean((y - predictions) ** 2))
+        # Reuse the last result while the user's expenses are unchanged
+        fingerprint = await run_in_threadpool(_expenses_fingerprint, db, user_id)
+        cache_key = ("accuracy", fingerprint)
+        hit, cached_result = response_cache.get(analytics_namespace(user_id), cache_key)
+        if hit:
+            return cached_result
+        
+        result = await run_in_threadpool(_calculate_accuracy, db, user_id)
+        response_cache.set(
+            analytics_namespace(user_id), cache_key, result, ttl=ACCURACY_CACHE_TTL
+        )
         
-        return {
-            "success": True,
-            "metrics": {
-                "r_squared": float(r_squared),
-                "rmse": float(rmse),
-                "training_samples": len(monthly_data),
-                "model_type": "Linear Regression"
-            }
-        }
+        return result
         
     except Exception as e:
         logger.error(f"Error calculating accuracy: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _top_category_averages(db: Session, user_id: int, limit: int = 5) -> list:
+    """
+    Categories with the highest average expense amount
+    
+    Returns:
+        List of (category name, average amount) rows
+    """
+    avg_amount = func.avg(tables.Expense.amount).label('avg_amount')
+    return db.query(
+        tables.Category.name,
+        avg_amount
+    ).join(
+        tables.Expense,
+        tables.Expense.category_id == tables.Category.id
+    ).filter(
+        tables.Expense.user_id == user_id
+    ).group_by(
+        tables.Category.name
+    ).order_by(
+        avg_amount.desc(),
+        tables.Category.name
+    ).limit(limit).all()
+
+
 @router.get("/recommendations")
-def get_budget_recommendations(
+@cached(user_analytics_namespace)
+async def get_budget_recommendations(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -342,42 +473,25 @@ def get_budget_recommendations(
         Budget recommendations
     """
     try:
-        # Fetch expenses
-        expenses = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
-        ).all()
+        # Average spending by category, top 5 (aggregated in SQL)
+        rows = await run_in_threadpool(_top_category_averages, db, user_id)
         
-        if not expenses:
+        if not rows:
             return {
                 "success": False,
                 "message": "No data available for recommendations"
             }
         
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount,
-            'category': exp.category.name
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        
-        # Calculate average spending by category
-        category_avg = df.groupby('category')['amount'].mean().sort_values(ascending=False)
-        
-        # Generate recommendations
-        recommendations = []
-        
-        for category, avg in category_avg.head(5).items():
-            # Suggest budget as 110% of average (with buffer)
-            suggested_budget = avg * 1.1
-            
-            recommendations.append({
+        # Generate recommendations (suggested budget is 110% of the average)
+        recommendations = [
+            {
                 "category": category,
                 "current_average": float(avg),
-                "suggested_budget": float(suggested_budget),
+                "suggested_budget": float(avg * 1.1),
                 "reason": f"Based on average spending of ${avg:.2f}"
-            })
+            }
+            for category, avg in rows
+        ]
         
         return {
             "success": True,
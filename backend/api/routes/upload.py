@@ -1,16 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from pathlib import Path
-import shutil
+from typing import List, Optional, Tuple
+import aiofiles
+import asyncio
 import logging
 from datetime import datetime
-import os
+from uuid import uuid4
 
 from backend.models.database import get_db
 from backend.models import tables, schemas
+from backend.utils.cache import response_cache, analytics_namespace, category_cache
 from backend.services.ocr_service import ocr_service
 from backend.services.parser_service import receipt_parser
 from backend.services.classifier_service import expense_classifier
+from backend.services.analytics_service import analytics_service
 from backend.config.settings import settings
 from backend.config.constants import ERROR_MESSAGES
 
@@ -18,11 +24,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Bytes read per chunk when saving uploads
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+
+UPLOAD_DIR = Path(settings.upload_dir)
+
 
 def validate_file(file: UploadFile) -> bool:
     """Validates the uploaded file"""
     # Check extension
-    ext = file.filename.split('.')[-1].lower()
+    ext = Path(file.filename).suffix.lstrip('.').lower()
     if ext not in settings.allowed_extensions:
         raise HTTPException(
             status_code=400,
@@ -32,18 +43,163 @@ def validate_file(file: UploadFile) -> bool:
     return True
 
 
-def save_upload_file(file: UploadFile) -> str:
-    """Saves the uploaded file and returns the path"""
-    # Create unique name
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    filepath = os.path.join(settings.upload_dir, filename)
+async def save_upload_file(file: UploadFile) -> str:
+    """
+    Saves the uploaded file in chunks and returns the path
     
-    # Save file
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    Raises:
+        HTTPException: If the file exceeds the maximum upload size
+    """
+    # Create unique name (only the base name of the client filename is kept)
+    filename = f"{uuid4().hex}_{Path(file.filename).name}"
+    filepath = UPLOAD_DIR / filename
+    
+    # Save file without blocking the event loop, stopping as soon as
+    # the upload goes over the size limit
+    size = 0
+    try:
+        async with aiofiles.open(filepath, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.max_upload_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=ERROR_MESSAGES["file_too_large"]
+                    )
+                await buffer.write(chunk)
+    except HTTPException:
+        filepath.unlink()
+        raise
     
-    return filepath
+    return str(filepath)
+
+
+def _save_expense(db: Session, expense: tables.Expense):
+    """Persists an expense and invalidates the cached analytics"""
+    db.add(expense)
+    analytics_service.invalidate_monthly_summary(db, expense.user_id, expense.date)
+    db.commit()
+    response_cache.clear(analytics_namespace(1))
+    db.refresh(expense)
+
+
+async def _process_receipt(
+    file: UploadFile,
+    db: Session
+) -> Tuple[schemas.OCRResult, Optional[dict]]:
+    """
+    Saves, reads and classifies one receipt
+    
+    Args:
+        file: Image file (JPG, PNG) or PDF
+        db: Database session (only used to resolve the category)
+        
+    Returns:
+        Tuple of (OCR result, expense column values or None if no total was found)
+        
+    Raises:
+        HTTPException: If the file is invalid or the receipt cannot be read
+    """
+    # Validate file
+    validate_file(file)
+    
+    # Save file (OCR/ML and database work run in the threadpool)
+    filepath = await save_upload_file(file)
+    logger.info(f"File saved: {filepath}")
+    
+    # Extract text with OCR
+    ext = Path(file.filename).suffix.lstrip('.').lower()
+    
+    if ext == 'pdf':
+        ocr_result = await run_in_threadpool(ocr_service.extract_from_pdf, filepath)
+    else:
+        ocr_result = await run_in_threadpool(ocr_service.extract_text, filepath)
+    
+    if not ocr_result["success"]:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MESSAGES["ocr_failed"]
+        )
+    
+    # Parse receipt information
+    parsed_data = receipt_parser.parse_receipt(ocr_result["full_text"])
+    
+    # Validate parsed data
+    if not receipt_parser.validate_parsed_data(parsed_data):
+        raise HTTPException(
+            status_code=400,
+            detail="Could not extract valid information from the receipt"
+        )
+    
+    # Classify category
+    category_slug, classification_confidence = await run_in_threadpool(
+        expense_classifier.classify,
+        text=parsed_data.get("merchant", ""),
+        merchant=parsed_data.get("merchant"),
+        description=" ".join([item["description"] for item in parsed_data.get("items", [])])
+    )
+    
+    # Get category ID
+    category = await run_in_threadpool(category_cache.get, db, category_slug)
+    
+    # Calculate global confidence
+    parsing_confidence = receipt_parser.calculate_confidence(parsed_data)
+    global_confidence = (
+        ocr_result["confidence"] + parsing_confidence + classification_confidence
+    ) / 3
+    
+    # Prepare OCR response
+    ocr_response = schemas.OCRResult(
+        text=ocr_result["full_text"],
+        date=parsed_data.get("date"),
+        merchant=parsed_data.get("merchant"),
+        amount=parsed_data.get("total"),
+        category_id=category.id if category else None,
+        confidence=global_confidence,
+        raw_data={
+            "items": parsed_data.get("items", []),
+            "payment_method": parsed_data.get("payment_method"),
+            "ocr_blocks": ocr_result.get("text_blocks", [])
+        }
+    )
+    
+    if not parsed_data.get("total"):
+        return ocr_response, None
+    
+    expense_row = {
+        "user_id": 1,  # TODO: Get from token
+        "date": parsed_data.get("date") or datetime.now(),
+        "merchant": parsed_data.get("merchant"),
+        "category_id": category.id if category else 1,
+        "amount": parsed_data.get("total"),
+        "description": f"Items: {len(parsed_data.get('items', []))}",
+        "payment_method": parsed_data.get("payment_method"),
+        "source": "ocr",
+        "image_path": filepath,
+        "confidence": global_confidence
+    }
+    
+    return ocr_response, expense_row
+
+
+def _insert_expenses(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Inserts several expenses in a single statement and transaction
+    
+    Returns:
+        IDs of the new expenses, in the order of rows
+    """
+    result = db.execute(
+        insert(tables.Expense).returning(tables.Expense.id, sort_by_parameter_order=True),
+        rows
+    )
+    expense_ids = list(result.scalars())
+    analytics_service.invalidate_monthly_summary(
+        db, 1, min((row["date"] for row in rows), key=lambda d: (d.year, d.month))
+    )
+    db.commit()
+    response_cache.clear(analytics_namespace(1))
+    return expense_ids
 
 
 @router.post("/receipt", response_model=schemas.UploadReceiptResponse)
@@ -60,90 +216,16 @@ async def upload_receipt(
         auto_save: If True, automatically saves the expense to the database
     """
     try:
-        # Validate file
-        validate_file(file)
-        
-        # Save file
-        filepath = save_upload_file(file)
-        logger.info(f"File saved: {filepath}")
-        
-        # Extract text with OCR
-        ext = file.filename.split('.')[-1].lower()
-        
-        if ext == 'pdf':
-            ocr_result = ocr_service.extract_from_pdf(filepath)
-        else:
-            ocr_result = ocr_service.extract_text(filepath)
-        
-        if not ocr_result["success"]:
-            raise HTTPException(
-                status_code=400,
-                detail=ERROR_MESSAGES["ocr_failed"]
-            )
-        
-        # Parse receipt information
-        parsed_data = receipt_parser.parse_receipt(ocr_result["full_text"])
-        
-        # Validate parsed data
-        if not receipt_parser.validate_parsed_data(parsed_data):
-            raise HTTPException(
-                status_code=400,
-                detail="Could not extract valid information from the receipt"
-            )
-        
-        # Classify category
-        category_slug, classification_confidence = expense_classifier.classify(
-            text=parsed_data.get("merchant", ""),
-            merchant=parsed_data.get("merchant"),
-            description=" ".join([item["description"] for item in parsed_data.get("items", [])])
-        )
-        
-        # Get category ID
-        category = db.query(tables.Category).filter(
-            tables.Category.slug == category_slug
-        ).first()
-        
-        # Calculate global confidence
-        parsing_confidence = receipt_parser.calculate_confidence(parsed_data)
-        global_confidence = (ocr_result["confidence"] + parsing_confidence + classification_confidence) / 3
-        
-        # Prepare OCR response
-        ocr_response = schemas.OCRResult(
-            text=ocr_result["full_text"],
-            date=parsed_data.get("date"),
-            merchant=parsed_data.get("merchant"),
-            amount=parsed_data.get("total"),
-            category_id=category.id if category else None,
-            confidence=global_confidence,
-            raw_data={
-                "items": parsed_data.get("items", []),
-                "payment_method": parsed_data.get("payment_method"),
-                "ocr_blocks": ocr_result.get("text_blocks", [])
-            }
-        )
+        ocr_response, expense_row = await _process_receipt(file, db)
         
         expense_id = None
         
         # If auto_save is enabled, save the expense
-        if auto_save and parsed_data.get("total"):
+        if auto_save and expense_row:
             try:
-                expense = tables.Expense(
-                    user_id=1,  # TODO: Get from token
-                    date=parsed_data.get("date") or datetime.now(),
-                    merchant=parsed_data.get("merchant"),
-                    category_id=category.id if category else 1,
-                    amount=parsed_data.get("total"),
-                    description=f"Items: {len(parsed_data.get('items', []))}",
-                    payment_method=parsed_data.get("payment_method"),
-                    source="ocr",
-                    image_path=filepath,
-                    confidence=global_confidence,
-                    metadata=parsed_data
-                )
+                expense = tables.Expense(**expense_row)
                 
-                db.add(expense)
-                db.commit()
-                db.refresh(expense)
+                await run_in_threadpool(_save_expense, db, expense)
                 
                 expense_id = expense.id
                 logger.info(f"Expense automatically saved: ID {expense_id}")
@@ -169,6 +251,81 @@ async def upload_receipt(
         )
 
 
+@router.post("/receipts/batch", response_model=schemas.BatchUploadResponse)
+async def upload_receipts_batch(
+    files: List[UploadFile] = File(...),
+    auto_save: bool = Form(default=False),
+    db: Session = Depends(get_db)
+):
+    """
+    Uploads several receipts, processes them concurrently and saves the
+    resulting expenses with a single INSERT
+    
+    At most UPLOAD_BATCH_CONCURRENCY receipts are processed at the same time.
+    
+    Args:
+        files: Image files (JPG, PNG) or PDFs
+        auto_save: If True, saves every receipt with a detected total
+    """
+    # Load categories up front so concurrent receipts never share the session
+    await run_in_threadpool(category_cache.ensure_loaded, db)
+    
+    semaphore = asyncio.Semaphore(max(1, settings.upload_batch_concurrency))
+    
+    async def process(file: UploadFile):
+        async with semaphore:
+            return await _process_receipt(file, db)
+    
+    outcomes = await asyncio.gather(
+        *(process(file) for file in files),
+        return_exceptions=True
+    )
+    
+    results = []
+    rows = []
+    row_results = []
+    
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, HTTPException):
+                message = outcome.detail
+            else:
+                logger.error(f"Error processing receipt {file.filename}: {outcome}")
+                message = f"Error processing the receipt: {str(outcome)}"
+            results.append(schemas.UploadReceiptResponse(success=False, message=message))
+            continue
+        
+        ocr_response, expense_row = outcome
+        result = schemas.UploadReceiptResponse(
+            success=True,
+            message="Receipt processed successfully",
+            ocr_result=ocr_response
+        )
+        results.append(result)
+        
+        if auto_save and expense_row:
+            rows.append(expense_row)
+            row_results.append(result)
+    
+    if rows:
+        try:
+            expense_ids = await run_in_threadpool(_insert_expenses, db, rows)
+            for result, expense_id in zip(row_results, expense_ids):
+                result.expense_id = expense_id
+            logger.info(f"Expenses automatically saved: {len(expense_ids)}")
+        except Exception as e:
+            logger.error(f"Error automatically saving expenses: {e}")
+            db.rollback()
+    
+    processed = sum(result.success for result in results)
+    
+    return schemas.BatchUploadResponse(
+        success=processed > 0,
+        message=f"Processed {processed} of {len(files)} receipts",
+        results=results
+    )
+
+
 @router.post("/manual-expense")
 async def create_expense_from_ocr(
     ocr_data: schemas.OCRResult,
@@ -192,12 +349,10 @@ async def create_expense_from_ocr(
             amount=ocr_data.amount,
             source="ocr",
             confidence=ocr_data.confidence,
-            metadata=ocr_data.raw_data
+            extra_data=ocr_data.raw_data
         )
         
-        db.add(expense)
-        db.commit()
-        db.refresh(expense)
+        await run_in_threadpool(_save_expense, db, expense)
         
         return {
             "success": True,
@@ -221,21 +376,54 @@ async def suggest_category(
     """
     Suggests categories for a given string of text
     """
-    suggestions = expense_classifier.get_category_suggestions(text, top_n=3)
+    def _suggest():
+        suggestions = expense_classifier.get_category_suggestions(text, top_n=3)
+        
+        result = []
+        for category_slug, confidence in suggestions:
+            category = category_cache.get(db, category_slug)
+            
+            if category:
+                result.append({
+                    "category_id": category.id,
+                    "category_name": category.name,
+                    "slug": category.slug,
+                    "confidence": confidence,
+                    "icon": category.icon
+                })
+        
+        return result
     
-    result = []
-    for category_slug, confidence in suggestions:
-        category = db.query(tables.Category).filter(
-            tables.Category.slug == category_slug
-        ).first()
+    return await run_in_threadpool(_suggest)
+
+
+@router.post("/categories/classify/batch")
+async def classify_batch(
+    items: List[schemas.ClassifyRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Classifies several expense texts in one call
+    
+    The texts are vectorized and scored by the model together.
+    """
+    def _classify():
+        predictions = expense_classifier.classify_batch(
+            [item.model_dump() for item in items]
+        )
         
-        if category:
+        result = []
+        for category_slug, confidence in predictions:
+            category = category_cache.get(db, category_slug)
+            
             result.append({
-                "category_id": category.id,
-                "category_name": category.name,
-                "slug": category.slug,
-                "confidence": confidence,
-                "icon": category.icon
+                "category_id": category.id if category else None,
+                "category_name": category.name if category else None,
+                "slug": category_slug,
+                "confidence": float(confidence),
+                "icon": category.icon if category else None
             })
+        
+        return result
     
-    return result
+    return await run_in_threadpool(_classify)
@@ -1,4 +1,7 @@
 """Application constants"""
+import re
+
+import ahocorasick
 
 # Expense categories
 EXPENSE_CATEGORIES = {
@@ -96,6 +99,12 @@ OCR_PATTERNS = {
     ]
 }
 
+# OCR patterns compiled once at import
+OCR_PATTERNS_COMPILED = {
+    key: [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in patterns]
+    for key, patterns in OCR_PATTERNS.items()
+}
+
 # Analysis periods
 ANALYSIS_PERIODS = {
     "week": "Last week",
@@ -152,3 +161,35 @@ CURRENCIES = {
 }
 
 DEFAULT_CURRENCY = "USD"
+
+
+# Lowercased keyword set of each category, normalized once at import
+EXPENSE_CATEGORY_KEYWORDS_LOWER = {
+    slug: frozenset(keyword.lower() for keyword in info["keywords"])
+    for slug, info in EXPENSE_CATEGORIES.items()
+}
+
+
+def _build_keyword_automaton() -> ahocorasick.Automaton:
+    """
+    Builds an Aho-Corasick automaton over all category keywords
+    
+    Each keyword maps to (keyword, slugs), where slugs lists every category
+    containing it, so one pass over a text finds the keyword hits of all
+    categories.
+    """
+    keyword_slugs = {}
+    for slug, keywords in EXPENSE_CATEGORY_KEYWORDS_LOWER.items():
+        for keyword in keywords:
+            keyword_slugs.setdefault(keyword, []).append(slug)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, slugs in keyword_slugs.items():
+        automaton.add_word(keyword, (keyword, tuple(slugs)))
+    automaton.make_automaton()
+    
+    return automaton
+
+
+# Keyword -> categories index used by rule-based classification
+KEYWORD_AUTOMATON = _build_keyword_automaton()
@@ -1,6 +1,8 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, FrozenSet
+from functools import cached_property, lru_cache
+import json
 import os
 from pathlib import Path
 
@@ -27,6 +29,22 @@ class Settings(BaseSettings):
         default=f"sqlite:///{BASE_DIR}/data/database/expenses.db",
         alias="DATABASE_URL"
     )
+    db_pool_size: int = Field(default=20, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=40, alias="DB_MAX_OVERFLOW")
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")  # seconds
+    db_echo: bool = Field(default=False, alias="DB_ECHO")  # log every SQL statement
+    auto_create_schema: bool = Field(default=True, alias="AUTO_CREATE_SCHEMA")
+    
+    # Cache
+    cache_ttl: int = Field(default=60, alias="CACHE_TTL")  # seconds
+    
+    # Analytics snapshots (written by scripts/snapshot_expenses.py)
+    snapshot_dir: str = Field(
+        default=str(BASE_DIR / "data/processed/snapshots"),
+        alias="SNAPSHOT_DIR"
+    )
+    # Max age in seconds of a snapshot used for monthly trends (0 = never use)
+    snapshot_max_age: int = Field(default=0, alias="SNAPSHOT_MAX_AGE")
     
     # Security
     secret_key: str = Field(
@@ -42,6 +60,10 @@ class Settings(BaseSettings):
     # OCR Settings
     ocr_engine: str = Field(default="easyocr", alias="OCR_ENGINE")
     ocr_languages: List[str] = Field(default=["en", "es"], alias="OCR_LANGUAGES")
+    ocr_gpu: bool = Field(default=False, alias="OCR_GPU")  # requires CUDA-enabled PyTorch
+    ocr_quantize: bool = Field(default=True, alias="OCR_QUANTIZE")  # int8 models on CPU
+    # Threads preparing PDF pages for the (shared, one call at a time) OCR reader
+    ocr_pdf_workers: int = Field(default=2, alias="OCR_PDF_WORKERS")
     tesseract_path: str = Field(
         default="/usr/bin/tesseract",
         alias="TESSERACT_PATH"
@@ -63,14 +85,19 @@ class Settings(BaseSettings):
     
     # File Upload
     max_upload_size: int = Field(default=10485760, alias="MAX_UPLOAD_SIZE")  # 10MB
-    allowed_extensions: List[str] = Field(
-        default=["jpg", "jpeg", "png", "pdf"],
+    # Read as plain text so both a JSON list and "jpg,png" are accepted
+    # (see allowed_extensions)
+    allowed_extensions_raw: str = Field(
+        default="jpg,jpeg,png,pdf",
         alias="ALLOWED_EXTENSIONS"
     )
     upload_dir: str = Field(
         default=str(BASE_DIR / "data/raw"),
         alias="UPLOAD_DIR"
     )
+    # Receipts of one batch upload processed at the same time (file saving,
+    # preprocessing and parsing overlap; OCR calls run one at a time)
+    upload_batch_concurrency: int = Field(default=4, alias="UPLOAD_BATCH_CONCURRENCY")
     
     # Frontend
     streamlit_server_port: int = Field(default=8501, alias="STREAMLIT_SERVER_PORT")
@@ -86,18 +113,30 @@ class Settings(BaseSettings):
         alias="LOG_FILE"
     )
     
+    @cached_property
+    def allowed_extensions(self) -> FrozenSet[str]:
+        """
+        Allowed upload extensions, lowercase and without the leading dot
+        
+        ALLOWED_EXTENSIONS may be a JSON list or a comma-separated string.
+        """
+        value = self.allowed_extensions_raw.strip()
+        extensions = json.loads(value) if value.startswith("[") else value.split(",")
+        return frozenset(
+            ext.strip().lstrip(".").lower() for ext in extensions if ext.strip()
+        )
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
         extra = "allow"
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Create necessary directories if they don't exist
-        self._create_directories()
-    
-    def _create_directories(self):
-        """Creates necessary directories for the application"""
+    def ensure_dirs(self):
+        """
+        Creates necessary directories for the application
+        
+        Called once at application startup rather than on every import.
+        """
         directories = [
             self.upload_dir,
             os.path.dirname(self.classifier_model_path),
@@ -107,8 +146,16 @@ class Settings(BaseSettings):
         ]
         
         for directory in directories:
-            Path(directory).mkdir(parents=True, exist_ok=True)
+            path = Path(directory)
+            if not path.exists():
+                path.mkdir(parents=True, exist_ok=True)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Returns the settings, built once per process"""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -1,11 +1,30 @@
 """
 Expense classifier model definition
 """
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
+from sklearn.feature_extraction.text import (
+    HashingVectorizer,
+    TfidfTransformer,
+    TfidfVectorizer
+)
+from sklearn.naive_bayes import ComplementNB
+from sklearn.linear_model import SGDClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+from sklearn.utils import check_array
+from scipy.special import logsumexp
+from joblib import Parallel, delayed
 from typing import Tuple, List
+import numpy as np
+
+from backend.utils.numeric import NUMBA_AVAILABLE, _nb_predict
+
+# Size of the hashed feature space used by the Naive Bayes pipeline
+HASHING_N_FEATURES = 2 ** 18
+
+# Samples per task when Random Forest predictions are split across threads
+# (large enough to amortize the per-tree call overhead within each chunk)
+PREDICT_CHUNK_SIZE = 2048
 
 
 class ExpenseClassifierModel:
@@ -20,37 +39,48 @@ class ExpenseClassifierModel:
         """
         self.model_type = model_type
         self.pipeline = self._create_pipeline()
+        self._idf = None
+        self._log_prob_T = None
+        self._prior = None
+        self._analyze = None
+        self._hasher = None
     
     def _create_pipeline(self) -> Pipeline:
         """Create sklearn pipeline with vectorizer and classifier"""
         
-        # Vectorizer (common for all models)
-        vectorizer = TfidfVectorizer(
-            max_features=500,
-            ngram_range=(1, 2),
-            lowercase=True,
-            min_df=1,
-            max_df=0.95
-        )
-        
-        # Choose classifier
         if self.model_type == "random_forest":
+            # Vocabulary-based vectorizer so feature importances map to words
             classifier = RandomForestClassifier(
                 n_estimators=100,
                 max_depth=10,
                 random_state=42,
                 n_jobs=-1
             )
-        else:  # Default to Naive Bayes
-            classifier = MultinomialNB(alpha=1.0)
+            
+            return Pipeline([
+                ('tfidf', TfidfVectorizer(
+                    max_features=500,
+                    ngram_range=(1, 2),
+                    lowercase=True,
+                    min_df=1,
+                    max_df=0.95
+                )),
+                ('classifier', classifier)
+            ])
         
-        # Create pipeline
-        pipeline = Pipeline([
-            ('tfidf', vectorizer),
-            ('classifier', classifier)
+        # Default to Naive Bayes on hashed features: the vectorizer is
+        # stateless (no vocabulary to build or store), only IDF is fitted
+        return Pipeline([
+            ('vectorizer', HashingVectorizer(
+                n_features=HASHING_N_FEATURES,
+                ngram_range=(1, 2),
+                alternate_sign=False,
+                norm=None,
+                lowercase=True
+            )),
+            ('tfidf', TfidfTransformer(sublinear_tf=True)),
+            ('classifier', ComplementNB(alpha=1.0))
         ])
-        
-        return pipeline
     
     def fit(self, X: List[str], y: List[str]):
         """
@@ -61,6 +91,130 @@ class ExpenseClassifierModel:
             y: List of category labels
         """
         self.pipeline.fit(X, y)
+        self._idf = None
+        self._log_prob_T = None
+        self._prior = None
+    
+    def _transform(self, X: List[str]):
+        """
+        Turn texts into the classifier's feature matrix
+        
+        For the hashed pipeline the TF-IDF weighting is applied in place on
+        the CSR data array, instead of TfidfTransformer's copy and sparse
+        diagonal product on every call.
+        """
+        if self.model_type == "random_forest":
+            return self.pipeline[:-1].transform(X)
+        
+        # The hashed counts are a fresh matrix, so they can be modified
+        return self._weight(self.pipeline.named_steps['vectorizer'].transform(X))
+    
+    def _weight(self, features):
+        """Apply sublinear TF, IDF and L2 normalization to hashed counts in place"""
+        if getattr(self, '_idf', None) is None:
+            self._idf = self.pipeline.named_steps['tfidf'].idf_
+        
+        np.log(features.data, out=features.data)
+        features.data += 1  # sublinear_tf
+        features.data *= self._idf.take(features.indices)
+        normalize(features, norm='l2', copy=False)
+        
+        return features
+    
+    def _nb_params(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Raw Naive Bayes arrays used for scoring
+        
+        Returns a cached C-contiguous transpose of feature_log_prob_
+        (n_features x n_classes), so the large matrix is not copied on every
+        call, and the per-class term ComplementNB adds to the scores (the
+        class prior only when there is a single class).
+        """
+        if getattr(self, '_log_prob_T', None) is None:
+            classifier = self.pipeline.named_steps['classifier']
+            self._log_prob_T = np.ascontiguousarray(classifier.feature_log_prob_.T)
+            if len(classifier.classes_) == 1:
+                self._prior = classifier.class_log_prior_.astype(np.float64)
+            else:
+                self._prior = np.zeros(len(classifier.classes_))
+        
+        return self._log_prob_T, self._prior
+    
+    def _joint_log_likelihood(self, features) -> np.ndarray:
+        """Class scores of the Naive Bayes classifier for weighted features"""
+        log_prob_T, prior = self._nb_params()
+        return np.asarray(features @ log_prob_T) + prior
+    
+    def _nb_predict(self, features) -> np.ndarray:
+        """
+        Predicted class labels of the Naive Bayes classifier
+        
+        With Numba, a compiled kernel scores the CSR rows in parallel and
+        keeps only the argmax; otherwise the sparse product is used.
+        """
+        classes = self.pipeline.named_steps['classifier'].classes_
+        
+        if NUMBA_AVAILABLE:
+            log_prob_T, prior = self._nb_params()
+            return classes.take(_nb_predict(
+                features.data, features.indices, features.indptr, log_prob_T, prior
+            ))
+        
+        return classes.take(np.argmax(self._joint_log_likelihood(features), axis=1))
+    
+    def _forest_predict_proba(self, features) -> np.ndarray:
+        """
+        Random Forest probabilities, evaluated by chunks of samples
+        
+        Large batches are split into PREDICT_CHUNK_SIZE rows and each thread
+        runs every tree over its own chunk (tree traversal releases the GIL),
+        instead of the forest's default of one task per tree over all rows.
+        Small batches are predicted directly.
+        """
+        classifier = self.pipeline.named_steps['classifier']
+        n_samples = features.shape[0]
+        
+        if n_samples <= PREDICT_CHUNK_SIZE:
+            return classifier.predict_proba(features)
+        
+        features = check_array(features, accept_sparse='csr', dtype=np.float32)
+        
+        def chunk_proba(chunk):
+            proba = np.zeros((chunk.shape[0], len(classifier.classes_)))
+            for tree in classifier.estimators_:
+                proba += tree.predict_proba(chunk, check_input=False)
+            return proba / len(classifier.estimators_)
+        
+        chunks = Parallel(n_jobs=-1, prefer='threads')(
+            delayed(chunk_proba)(features[start:start + PREDICT_CHUNK_SIZE])
+            for start in range(0, n_samples, PREDICT_CHUNK_SIZE)
+        )
+        return np.vstack(chunks)
+    
+    def predict_one(self, text: str) -> str:
+        """
+        Predict the category of a single text
+        
+        Reuses the vectorizer's analyzer (compiled token pattern) and feature
+        hasher across calls instead of rebuilding them per request.
+        
+        Args:
+            text: Text sample
+            
+        Returns:
+            Predicted category
+        """
+        if self.model_type == "random_forest":
+            return self.predict([text])[0]
+        
+        if getattr(self, '_analyze', None) is None:
+            vectorizer = self.pipeline.named_steps['vectorizer']
+            self._analyze = vectorizer.build_analyzer()
+            self._hasher = vectorizer._get_hasher()
+        
+        features = self._weight(self._hasher.transform([self._analyze(text)]))
+        
+        return self._nb_predict(features)[0]
     
     def predict(self, X: List[str]) -> List[str]:
         """
@@ -72,7 +226,14 @@ class ExpenseClassifierModel:
         Returns:
             List of predicted categories
         """
-        return self.pipeline.predict(X)
+        classifier = self.pipeline.named_steps['classifier']
+        features = self._transform(X)
+        
+        if self.model_type == "random_forest":
+            proba = self._forest_predict_proba(features)
+            return classifier.classes_.take(np.argmax(proba, axis=1))
+        
+        return self._nb_predict(features)
     
     def predict_proba(self, X: List[str]):
         """
@@ -84,7 +245,13 @@ class ExpenseClassifierModel:
         Returns:
             Array of probabilities
         """
-        return self.pipeline.predict_proba(X)
+        features = self._transform(X)
+        
+        if self.model_type == "random_forest":
+            return self._forest_predict_proba(features)
+        
+        jll = self._joint_log_likelihood(features)
+        return np.exp(jll - logsumexp(jll, axis=1, keepdims=True))
     
     def score(self, X: List[str], y: List[str]) -> float:
         """
@@ -110,6 +277,7 @@ class ExpenseClassifierModel:
             List of (feature, importance) tuples
         """
         if self.model_type != "random_forest":
+            # Hashed features have no names to report
             return []
         
         # Get feature names
@@ -118,8 +286,12 @@ class ExpenseClassifierModel:
         # Get feature importances
         importances = self.pipeline.named_steps['classifier'].feature_importances_
         
-        # Sort by importance
-        indices = importances.argsort()[-top_n:][::-1]
+        # Select the top_n in linear time, then sort only those
+        top_n = min(top_n, len(importances))
+        if top_n <= 0:
+            return []
+        indices = np.argpartition(importances, -top_n)[-top_n:]
+        indices = indices[np.argsort(importances[indices])[::-1]]
         
         return [(feature_names[i], importances[i]) for i in indices]
     
@@ -130,10 +302,20 @@ class ExpenseClassifierModel:
         Returns:
             Dictionary with model details
         """
+        if self.model_type == "random_forest":
+            vectorizer_info = {
+                "vectorizer": "TF-IDF",
+                "max_features": 500
+            }
+        else:
+            vectorizer_info = {
+                "vectorizer": "Hashing + TF-IDF",
+                "n_features": HASHING_N_FEATURES
+            }
+        
         return {
             "model_type": self.model_type,
-            "vectorizer": "TF-IDF",
-            "max_features": 500,
+            **vectorizer_info,
             "ngram_range": "(1, 2)",
             "classifier": str(type(self.pipeline.named_steps['classifier']).__name__)
         }
@@ -149,6 +331,28 @@ def create_default_model() -> ExpenseClassifierModel:
     return ExpenseClassifierModel(model_type="naive_bayes")
 
 
+def create_online_pipeline() -> Pipeline:
+    """
+    Create the pipeline used by the classification service
+    
+    The hashing vectorizer is stateless (no vocabulary to fit or store) and
+    the logistic-loss SGD classifier supports partial_fit, so the model can
+    be updated with new samples without retraining from scratch.
+    
+    Returns:
+        Unfitted sklearn Pipeline with 'vectorizer' and 'clf' steps
+    """
+    return Pipeline([
+        ('vectorizer', HashingVectorizer(
+            n_features=HASHING_N_FEATURES,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            lowercase=True
+        )),
+        ('clf', SGDClassifier(loss='log_loss', random_state=42))
+    ])
+
+
 def create_advanced_model() -> ExpenseClassifierModel:
     """
     Create advanced classifier model with Random Forest
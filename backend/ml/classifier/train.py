@@ -2,22 +2,25 @@
 Training script for expense classifier
 """
 import sys
+from functools import lru_cache
 from pathlib import Path
-import pickle
 
 # Add root to path
 root_dir = Path(__file__).parent.parent.parent.parent
 sys.path.append(str(root_dir))
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split, cross_val_score
 import pandas as pd
+from sqlalchemy import select
 
 from backend.models.database import SessionLocal
 from backend.models import tables
-from backend.config.constants import EXPENSE_CATEGORIES
+from backend.utils.model_io import dump_model
+from backend.ml.classifier.model import create_online_pipeline
+from backend.config.constants import EXPENSE_CATEGORY_KEYWORDS_LOWER
+
+# Rows fetched per round-trip when streaming training data
+TRAINING_BATCH_SIZE = 5000
 
 
 def load_training_data():
@@ -25,23 +28,37 @@ def load_training_data():
     db = SessionLocal()
     
     try:
-        # Fetch all expenses with categories
-        expenses = db.query(tables.Expense).join(tables.Category).all()
+        # Categories are a handful of rows: map id -> slug once and label
+        # the expenses in Python instead of joining every row
+        slug_by_id = dict(db.execute(
+            select(tables.Category.id, tables.Category.slug)
+        ).all())
         
-        if not expenses:
-            print("⚠️ No expenses found in database")
-            return None, None
+        # Stream (merchant, description, category_id) tuples; no ORM
+        # objects are built
+        rows = db.execute(
+            select(
+                tables.Expense.merchant,
+                tables.Expense.description,
+                tables.Expense.category_id
+            ).execution_options(yield_per=TRAINING_BATCH_SIZE)
+        )
         
         # Prepare training data
         X = []
         y = []
         
-        for expense in expenses:
+        for merchant, description, category_id in rows:
+            slug = slug_by_id.get(category_id)
             # Combine merchant and description
-            text = f"{expense.merchant or ''} {expense.description or ''}".strip()
-            if text:
+            text = f"{merchant or ''} {description or ''}".strip()
+            if text and slug is not None:
                 X.append(text.lower())
-                y.append(expense.category.slug)
+                y.append(slug)
+        
+        if not y:
+            print("⚠️ No expenses found in database")
+            return None, None
         
         return X, y
         
@@ -49,27 +66,33 @@ def load_training_data():
         db.close()
 
 
-def create_synthetic_data():
-    """Create synthetic training data from category keywords"""
+@lru_cache(maxsize=1)
+def _synthetic_samples():
+    """Synthetic (X, y) tuples; a pure function of EXPENSE_CATEGORIES"""
     X = []
     y = []
     
-    for category_slug, info in EXPENSE_CATEGORIES.items():
-        keywords = info["keywords"]
-        
-        for keyword in keywords:
+    for category_slug, keywords in EXPENSE_CATEGORY_KEYWORDS_LOWER.items():
+        # Sorted so the sample order is the same on every run
+        for keyword in sorted(keywords):
             # Add keyword as-is
-            X.append(keyword.lower())
+            X.append(keyword)
             y.append(category_slug)
             
             # Add variations
-            X.append(f"purchase at {keyword}".lower())
+            X.append(f"purchase at {keyword}")
             y.append(category_slug)
             
-            X.append(f"{keyword} store".lower())
+            X.append(f"{keyword} store")
             y.append(category_slug)
     
-    return X, y
+    return tuple(X), tuple(y)
+
+
+def create_synthetic_data():
+    """Create synthetic training data from category keywords"""
+    X, y = _synthetic_samples()
+    return list(X), list(y)
 
 
 def train_classifier():
@@ -96,23 +119,17 @@ def train_classifier():
         print("❌ Insufficient training data")
         return None
     
-    # Split data
+    # Split data (classes are balanced by the synthetic samples, so a plain
+    # shuffled split is enough)
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+        X, y, test_size=0.2, random_state=42, shuffle=True
     )
     
     print(f"📈 Training set: {len(X_train)} samples")
     print(f"📊 Test set: {len(X_test)} samples")
     
-    # Create pipeline
-    pipeline = Pipeline([
-        ('tfidf', TfidfVectorizer(
-            max_features=500,
-            ngram_range=(1, 2),
-            lowercase=True
-        )),
-        ('clf', MultinomialNB())
-    ])
+    # Create pipeline (same one the service updates incrementally)
+    pipeline = create_online_pipeline()
     
     # Train model
     print("🔄 Training model...")
@@ -146,8 +163,7 @@ def save_model(model):
     model_path = model_dir / "classifier.pkl"
     
     # Save model
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
+    dump_model(model, model_path)
     
     print(f"💾 Model saved to: {model_path}")
 
@@ -6,6 +6,24 @@ import pandas as pd
 from sklearn.linear_model import LinearRegression
 from typing import List, Tuple, Optional
 
+from backend.utils.numeric import _forecast_bounds
+
+
+def _ensure_datetime(df: pd.DataFrame, column: str = 'date') -> pd.DataFrame:
+    """
+    Parses a date column in place unless it already holds datetimes
+    
+    Args:
+        df: DataFrame to update
+        column: Name of the date column
+        
+    Returns:
+        The same DataFrame
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df[column]):
+        df[column] = pd.to_datetime(df[column], cache=True, format='ISO8601')
+    return df
+
 
 class ExpensePredictorModel:
     """Time series prediction model for expenses"""
@@ -39,18 +57,18 @@ class ExpensePredictorModel:
         Returns:
             Tuple of (X, y) arrays
         """
-        # Ensure date is datetime
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
+        _ensure_datetime(df)
         
-        # Aggregate by month
-        monthly = df.groupby(pd.Grouper(key='date', freq='M'))['amount'].sum().reset_index()
+        # Aggregate by month (resample bins by date, no prior sort needed)
+        monthly = df.set_index('date')['amount'].resample('MS').sum().reset_index()
         
         # Create sequential month numbers
-        monthly['month_num'] = range(len(monthly))
+        monthly['month_num'] = np.arange(len(monthly))
         
-        X = monthly[['month_num']].values
-        y = monthly['amount'].values
+        # Both stay float64: LinearRegression casts y to the dtype of X, and
+        # float32 monthly totals lose cents above about 100k
+        X = monthly[['month_num']].to_numpy(dtype=np.float64)
+        y = monthly['amount'].to_numpy(dtype=np.float64)
         
         return X, y
     
@@ -103,28 +121,33 @@ class ExpensePredictorModel:
             raise ValueError("Model must be fitted before prediction")
         
         # Generate future period numbers
-        future_periods = np.array([[last_period + i] for i in range(1, n_periods + 1)])
+        periods = last_period + np.arange(1, n_periods + 1, dtype=np.int32)
         
-        # Make predictions
-        predictions = self.predict(future_periods)
-        
-        # Calculate confidence intervals (simplified approach)
-        # In production, use proper statistical methods
-        std_error = predictions * 0.1  # 10% standard error (simplified)
+        # Calculate predictions and confidence intervals (simplified approach:
+        # 10% standard error). In production, use proper statistical methods
         z_score = 1.96 if confidence_level == 0.95 else 2.576
-        margin = z_score * std_error
-        
-        results = []
-        for i, pred in enumerate(predictions):
-            results.append({
-                'period': int(last_period + i + 1),
-                'predicted_amount': float(pred),
-                'lower_bound': float(max(0, pred - margin[i])),
-                'upper_bound': float(pred + margin[i]),
-                'confidence': confidence_level
-            })
+        predictions, lower, upper = _forecast_bounds(
+            float(last_period),
+            n_periods,
+            float(self.model.coef_[0]),
+            float(self.model.intercept_),
+            z_score,
+            0.1
+        )
         
-        return results
+        # tolist() converts each column to Python numbers in one pass
+        return [
+            {
+                'period': period,
+                'predicted_amount': pred,
+                'lower_bound': low,
+                'upper_bound': up,
+                'confidence': confidence_level
+            }
+            for period, pred, low, up in zip(
+                periods.tolist(), predictions.tolist(), lower.tolist(), upper.tolist()
+            )
+        ]
     
     def score(self, X: np.ndarray, y: np.ndarray) -> float:
         """
@@ -199,8 +222,7 @@ class TimeSeriesFeatureExtractor:
         Returns:
             DataFrame with additional features
         """
-        df = df.copy()
-        df['date'] = pd.to_datetime(df['date'])
+        df = _ensure_datetime(df.copy())
         
         df['month'] = df['date'].dt.month
         df['quarter'] = df['date'].dt.quarter
@@ -229,8 +251,23 @@ class TimeSeriesFeatureExtractor:
         """
         df = df.copy()
         
-        for lag in lags:
-            df[f'{target_col}_lag_{lag}'] = df[target_col].shift(lag)
+        values = df[target_col].to_numpy()
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float64)
+        n = len(values)
+        
+        # Fill all lag columns in one 2-D block (NaN where no lagged value)
+        lag_block = np.full((n, len(lags)), np.nan, dtype=values.dtype)
+        for i, lag in enumerate(lags):
+            if abs(lag) >= n:
+                continue
+            if lag >= 0:
+                lag_block[lag:, i] = values[:n - lag]
+            else:
+                lag_block[:n + lag, i] = values[-lag:]
+        
+        lag_columns = [f'{target_col}_lag_{lag}' for lag in lags]
+        df[lag_columns] = pd.DataFrame(lag_block, index=df.index, columns=lag_columns)
         
         return df
 
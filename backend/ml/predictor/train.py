@@ -3,7 +3,6 @@ Training script for expense predictor
 """
 import sys
 from pathlib import Path
-import pickle
 
 # Add root to path
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -13,50 +12,44 @@ import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score
+from sqlalchemy import select
 
-from backend.models.database import SessionLocal
+from backend.models.database import engine
 from backend.models import tables
+from backend.utils.model_io import dump_model
+from backend.ml.predictor.model import _ensure_datetime
 
 
 def load_expense_data():
     """Load expense data from database"""
-    db = SessionLocal()
-    
-    try:
-        # Fetch all expenses
-        expenses = db.query(tables.Expense).all()
-        
-        if not expenses:
-            print("⚠️ No expenses found in database")
-            return None
-        
-        # Convert to DataFrame
-        data = [{
-            'date': exp.date,
-            'amount': exp.amount,
-            'category': exp.category.slug
-        } for exp in expenses]
-        
-        df = pd.DataFrame(data)
-        return df
-        
-    finally:
-        db.close()
+    # Read the joined columns straight into a typed DataFrame
+    query = select(
+        tables.Expense.date,
+        tables.Expense.amount,
+        tables.Category.slug.label('category')
+    ).join(
+        tables.Category,
+        tables.Expense.category_id == tables.Category.id
+    )
+    
+    df = pd.read_sql_query(query, con=engine, parse_dates=['date'])
+    
+    if df.empty:
+        print("⚠️ No expenses found in database")
+        return None
+    
+    return df
 
 
 def prepare_time_series_data(df: pd.DataFrame):
     """Prepare data for time series prediction"""
-    # Ensure date is datetime
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Sort by date
-    df = df.sort_values('date')
+    _ensure_datetime(df)
     
-    # Aggregate by month
-    monthly = df.groupby(pd.Grouper(key='date', freq='M'))['amount'].sum().reset_index()
+    # Aggregate by month (resample bins by date, no prior sort needed)
+    monthly = df.set_index('date')['amount'].resample('MS').sum().reset_index()
     
     # Create month number feature
-    monthly['month_num'] = range(len(monthly))
+    monthly['month_num'] = np.arange(len(monthly))
     
     return monthly
 
@@ -112,8 +105,7 @@ def save_model(model):
     model_path = model_dir / "predictor.pkl"
     
     # Save model
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
+    dump_model(model, model_path)
     
     print(f"💾 Model saved to: {model_path}")
 
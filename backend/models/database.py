@@ -1,20 +1,50 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from backend.config.settings import settings
 
 # Create database engine
+# Connections are pooled and reused across requests; pre-ping discards
+# connections dropped by the server before they are handed to a session.
 engine = create_engine(
     settings.database_url,
     connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-    echo=settings.debug
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.db_pool_recycle,
+    echo=settings.db_echo
 )
 
+# Per-connection SQLite settings: foreign keys are only enforced when
+# enabled; WAL lets readers run alongside a writer, NORMAL sync skips the
+# fsync on every commit (safe in WAL mode) and the page cache is 64 MB.
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        """Applies SQLITE_PRAGMAS to every new SQLite connection"""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 # Database session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps committed objects loaded; handlers that
+# return server-generated values (defaults, relationships) refresh explicitly.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
 
 # Base for models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    """Declarative base of the ORM models"""
 
 
 def get_db():
@@ -29,13 +59,34 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """Initializes the database by creating all tables"""
-    from backend.models.tables import (
-        User, Expense, Category, Budget, Prediction
-    )
-    Base.metadata.create_all(bind=engine)
+# Advisory lock key shared by all workers creating the schema (PostgreSQL)
+SCHEMA_LOCK_KEY = 724519
+
+
+def init_db() -> bool:
+    """
+    Initializes the database by creating all tables
+    
+    On PostgreSQL the DDL runs under a transaction-level advisory lock, so
+    when several workers start at once only one of them creates the schema.
+    
+    Returns:
+        True if this process created the schema, False if another one holds the lock
+    """
+    from backend.models import tables  # noqa: F401 (registers the models)
+    
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"),
+                {"key": SCHEMA_LOCK_KEY}
+            ).scalar()
+            if not acquired:
+                return False
+        Base.metadata.create_all(bind=connection)
+    
     print("✅ Database initialized successfully")
+    return True
 
 
 def drop_db():
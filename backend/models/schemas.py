@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, EmailStr, validator
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
@@ -46,8 +46,7 @@ class UserInDB(UserBase):
     created_at: datetime
     updated_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Category schemas
@@ -75,8 +74,7 @@ class CategoryInDB(CategoryBase):
     id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True, frozen=True)
 
 
 # Expense schemas
@@ -111,15 +109,14 @@ class ExpenseInDB(ExpenseBase):
     source: str
     image_path: Optional[str]
     confidence: Optional[float]
-    metadata: Dict[str, Any]
+    metadata: Dict[str, Any] = Field(default_factory=dict, validation_alias="extra_data")
     created_at: datetime
     updated_at: Optional[datetime]
     
     # Nested data
     category: Optional[CategoryInDB] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True, frozen=True)
 
 
 # Budget schemas
@@ -151,8 +148,7 @@ class BudgetInDB(BudgetBase):
     
     category: Optional[CategoryInDB] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Prediction schemas
@@ -173,8 +169,7 @@ class PredictionInDB(PredictionBase):
     
     category: Optional[CategoryInDB] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # OCR schemas
@@ -195,6 +190,18 @@ class UploadReceiptResponse(BaseModel):
     expense_id: Optional[int] = None
 
 
+class BatchUploadResponse(BaseModel):
+    success: bool
+    message: str
+    results: List[UploadReceiptResponse] = []
+
+
+class ClassifyRequest(BaseModel):
+    text: str
+    merchant: Optional[str] = None
+    description: Optional[str] = None
+
+
 # Analytics schemas
 class CategorySummary(BaseModel):
     category_id: int
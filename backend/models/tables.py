@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, JSON
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Any, List, Optional
+
+from sqlalchemy import Integer, String, Float, DateTime, ForeignKey, Boolean, Text, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from backend.models.database import Base
 
@@ -8,77 +11,180 @@ class User(Base):
     """User model"""
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), unique=True, index=True, nullable=False)
-    name = Column(String(255), nullable=False)
-    hashed_password = Column(String(255), nullable=False)
-    is_active = Column(Boolean, default=True)
-    settings = Column(JSON, default={})
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)
+    settings: Mapped[Optional[Any]] = mapped_column(JSON, default={})
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), onupdate=func.now()
+    )
     
     # Relationships
-    expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
-    budgets = relationship("Budget", back_populates="user", cascade="all, delete-orphan")
-    predictions = relationship("Prediction", back_populates="user", cascade="all, delete-orphan")
+    expenses: Mapped[List["Expense"]] = relationship(
+        "Expense", back_populates="user", cascade="all, delete-orphan"
+    )
+    budgets: Mapped[List["Budget"]] = relationship(
+        "Budget", back_populates="user", cascade="all, delete-orphan"
+    )
+    predictions: Mapped[List["Prediction"]] = relationship(
+        "Prediction", back_populates="user", cascade="all, delete-orphan"
+    )
 
 
 class Category(Base):
     """Expense category model"""
     __tablename__ = "categories"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), unique=True, nullable=False, index=True)
-    slug = Column(String(100), unique=True, nullable=False, index=True)
-    parent_category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
-    color = Column(String(7), default="#9E9E9E")  # Hex color
-    icon = Column(String(10), default="📦")
-    keywords = Column(JSON, default=[])  # List of keywords
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False, index=True)
+    slug: Mapped[str] = mapped_column(String(100), unique=True, nullable=False, index=True)
+    parent_category_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("categories.id"), nullable=True
+    )
+    color: Mapped[Optional[str]] = mapped_column(String(7), default="#9E9E9E")  # Hex color
+    icon: Mapped[Optional[str]] = mapped_column(String(10), default="📦")
+    keywords: Mapped[Optional[Any]] = mapped_column(JSON, default=[])  # List of keywords
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
     
     # Relationships
-    parent = relationship("Category", remote_side=[id], backref="subcategories")
-    expenses = relationship("Expense", back_populates="category")
-    budgets = relationship("Budget", back_populates="category")
-    predictions = relationship("Prediction", back_populates="category")
+    parent: Mapped[Optional["Category"]] = relationship(
+        "Category", remote_side=[id], backref="subcategories"
+    )
+    expenses: Mapped[List["Expense"]] = relationship("Expense", back_populates="category")
+    budgets: Mapped[List["Budget"]] = relationship("Budget", back_populates="category")
+    predictions: Mapped[List["Prediction"]] = relationship(
+        "Prediction", back_populates="category"
+    )
 
 
 class Expense(Base):
     """Expense model"""
     __tablename__ = "expenses"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    date = Column(DateTime(timezone=True), nullable=False, index=True)
-    merchant = Column(String(255))
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False, index=True)
-    amount = Column(Float, nullable=False)
-    description = Column(Text)
-    payment_method = Column(String(50))
-    source = Column(String(50), default="manual")
-    image_path = Column(String(500))
-    confidence = Column(Float)
-    extra_data = Column(JSON, default={}) 
-    is_recurring = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False, index=True
+    )
+    date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    merchant: Mapped[Optional[str]] = mapped_column(String(255))
+    category_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("categories.id"), nullable=False, index=True
+    )
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    payment_method: Mapped[Optional[str]] = mapped_column(String(50))
+    source: Mapped[Optional[str]] = mapped_column(String(50), default="manual")
+    image_path: Mapped[Optional[str]] = mapped_column(String(500))
+    confidence: Mapped[Optional[float]] = mapped_column(Float)
+    extra_data: Mapped[Optional[Any]] = mapped_column(JSON, default={}) 
+    is_recurring: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), onupdate=func.now()
+    )
     
     # Relationships
-    user = relationship("User", back_populates="expenses")
-    category = relationship("Category", back_populates="expenses")
+    user: Mapped["User"] = relationship("User", back_populates="expenses")
+    category: Mapped["Category"] = relationship("Category", back_populates="expenses")
+    
+    # Composite indexes for the per-user date/category/merchant filters used by
+    # the expenses and analytics endpoints (amount is INCLUDEd on PostgreSQL)
+    __table_args__ = (
+        Index(
+            "ix_expense_user_date",
+            user_id, date.desc(), id.desc(),
+            postgresql_include=["amount"]
+        ),
+        Index(
+            "ix_expense_user_cat_date",
+            user_id, category_id, date,
+            postgresql_include=["amount"]
+        ),
+        Index(
+            "ix_expense_user_date_cat",
+            user_id, date, category_id,
+            postgresql_include=["amount"]
+        ),
+        Index(
+            "ix_expense_user_merchant",
+            user_id, merchant,
+            postgresql_include=["amount"]
+        ),
+    )
 
 
 class Budget(Base):
     """Budget model"""
     __tablename__ = "budgets"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False, index=True)
-    amount = Column(Float, nullable=False)
-    period = Column(String(20), default="monthly")  # monthly, weekly, yearly
-    start_date = Column(DateTime(timezone=True), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False, index=True
+    )
+    category_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("categories.id"), nullable=False, index=True
+    )
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    # monthly, weekly, yearly
+    period: Mapped[Optional[str]] = mapped_column(
+        String(20), default="monthly"
+    )
+    start_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     
     # Relationships
-    user = relationship("User", back_populates="budgets")
-    category = relationship("Category", back_populates="budgets")
+    user: Mapped["User"] = relationship("User", back_populates="budgets")
+    category: Mapped["Category"] = relationship("Category", back_populates="budgets")
+
+
+class Prediction(Base):
+    """Forecast expense model"""
+    __tablename__ = "predictions"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False, index=True
+    )
+    category_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("categories.id"), nullable=False, index=True
+    )
+    month: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    predicted_amount: Mapped[float] = mapped_column(Float, nullable=False)
+    lower_bound: Mapped[Optional[float]] = mapped_column(Float)
+    upper_bound: Mapped[Optional[float]] = mapped_column(Float)
+    confidence: Mapped[Optional[float]] = mapped_column(Float)
+    model_version: Mapped[Optional[str]] = mapped_column(String(50))
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    
+    # Relationships
+    user: Mapped["User"] = relationship("User", back_populates="predictions")
+    category: Mapped["Category"] = relationship("Category", back_populates="predictions")
+
+
+class MonthlySummary(Base):
+    """Precomputed monthly expense totals (refreshed by scripts/refresh_monthly_summary.py)"""
+    __tablename__ = "monthly_summary"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    year: Mapped[int] = mapped_column(Integer, nullable=False)
+    month: Mapped[int] = mapped_column(Integer, nullable=False)
+    total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    refreshed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    
+    __table_args__ = (
+        Index("ix_monthly_summary_user_month", user_id, year, month, unique=True),
+    )
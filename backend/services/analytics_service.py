@@ -1,19 +1,58 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
+from sqlalchemy import func, and_, or_, extract, case
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
+import importlib.util
+import os
+import time
 import numpy as np
+import pandas as pd
 import logging
 
+from backend.config.settings import settings
 from backend.models import tables
 from backend.config.constants import ANOMALY_THRESHOLDS
+from backend.utils.cache import cached_per_user
 
 logger = logging.getLogger(__name__)
 
+# Length of each named reporting period
+_PERIOD_DELTAS = {
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "quarter": timedelta(days=90),
+    "year": timedelta(days=365),
+}
+
+# Start of the "all time" period
+_ALL_TIME_START = datetime(2000, 1, 1)
+
+
+def _resolve_period(
+    period: str,
+    default: Optional[timedelta] = None
+) -> Tuple[datetime, datetime]:
+    """
+    Date range of a named period ending now
+    
+    Args:
+        period: week, month, quarter or year
+        default: Length used for other periods (all time if None)
+        
+    Returns:
+        Tuple (start_date, end_date)
+    """
+    end_date = datetime.now()
+    delta = _PERIOD_DELTAS.get(period, default)
+    start_date = end_date - delta if delta is not None else _ALL_TIME_START
+    return start_date, end_date
+
 
 class AnalyticsService:
     """Service for expense data analysis"""
     
+    @cached_per_user()
     def get_period_summary(
         self,
         db: Session,
@@ -24,19 +63,8 @@ class AnalyticsService:
         """
         Retrieves a summary for a specific time period
         """
-        # Calculate dates
-        end_date = datetime.now()
-        
-        if period == "week":
-            start_date = end_date - timedelta(days=7)
-        elif period == "month":
-            start_date = end_date - timedelta(days=30)
-        elif period == "quarter":
-            start_date = end_date - timedelta(days=90)
-        elif period == "year":
-            start_date = end_date - timedelta(days=365)
-        else:  # all time
-            start_date = datetime(2000, 1, 1)
+        # Calculate dates (unknown periods mean all time)
+        start_date, end_date = _resolve_period(period)
         
         # Base Query
         query = db.query(
@@ -70,6 +98,7 @@ class AnalyticsService:
             "average_per_day": avg_per_day
         }
     
+    @cached_per_user()
     def get_trends(
         self,
         db: Session,
@@ -81,15 +110,15 @@ class AnalyticsService:
         """
         Retrieves grouped spending trends
         """
-        # Calculate dates
-        end_date = datetime.now()
+        # Calculate dates (other periods default to a year)
+        start_date, end_date = _resolve_period(period, _PERIOD_DELTAS["year"])
         
-        if period == "week":
-            start_date = end_date - timedelta(days=7)
-        elif period == "month":
-            start_date = end_date - timedelta(days=30)
-        else:  # year
-            start_date = end_date - timedelta(days=365)
+        if group_by == "month":
+            snapshot = self._read_fresh_snapshot(user_id)
+            if snapshot is not None:
+                return self._monthly_trends_from_snapshot(
+                    snapshot, start_date, end_date, category_id
+                )
         
         # Build query based on grouping
         if group_by == "day":
@@ -152,6 +181,208 @@ class AnalyticsService:
         
         return trends
     
+    def _read_fresh_snapshot(self, user_id: int) -> Optional[pd.DataFrame]:
+        """
+        Loads a user's Parquet snapshot if it is recent enough
+        
+        Returns:
+            DataFrame with date, amount and category_id columns, or None if
+            snapshots are disabled, missing, stale or unreadable
+        """
+        if settings.snapshot_max_age <= 0:
+            return None
+        
+        path = snapshot_path(user_id)
+        try:
+            if time.time() - path.stat().st_mtime > settings.snapshot_max_age:
+                return None
+            return pd.read_parquet(path, columns=["date", "amount", "category_id"])
+        except Exception as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Could not read expense snapshot {path}: {e}")
+            return None
+    
+    @staticmethod
+    def _monthly_trends_from_snapshot(
+        snapshot: pd.DataFrame,
+        start_date: datetime,
+        end_date: datetime,
+        category_id: Optional[int] = None
+    ) -> List[Dict]:
+        """Monthly totals and counts computed from a snapshot (same shape as get_trends)"""
+        mask = (snapshot["date"] >= start_date) & (snapshot["date"] <= end_date)
+        if category_id:
+            mask &= snapshot["category_id"] == category_id
+        rows = snapshot.loc[mask]
+        
+        monthly = rows.groupby(
+            [rows["date"].dt.year.rename("year"), rows["date"].dt.month.rename("month")]
+        )["amount"].agg(["sum", "count"])
+        
+        return [
+            {"year": int(year), "month": int(month), "total": float(total), "count": int(count)}
+            for (year, month), total, count in zip(monthly.index, monthly["sum"], monthly["count"])
+        ]
+    
+    def write_expense_snapshots(self, db: Session, user_id: Optional[int] = None) -> int:
+        """
+        Writes per-user Parquet snapshots of (date, amount, category_id)
+        
+        Files are Snappy-compressed and replaced atomically, so readers never
+        see a partially written snapshot.
+        
+        Args:
+            user_id: Snapshot a single user (all users if None)
+            
+        Returns:
+            Number of snapshot files written
+            
+        Raises:
+            RuntimeError: If pyarrow is not installed
+        """
+        if importlib.util.find_spec("pyarrow") is None:
+            raise RuntimeError("pyarrow is required to write expense snapshots")
+        
+        query = db.query(
+            tables.Expense.user_id,
+            tables.Expense.date,
+            tables.Expense.amount,
+            tables.Expense.category_id
+        )
+        if user_id is not None:
+            query = query.filter(tables.Expense.user_id == user_id)
+        
+        expenses = pd.DataFrame(
+            query.all(), columns=["user_id", "date", "amount", "category_id"]
+        )
+        expenses["date"] = pd.to_datetime(expenses["date"])
+        if expenses["date"].dt.tz is not None:
+            # Stored as naive timestamps, like the values SQLite returns
+            expenses["date"] = expenses["date"].dt.tz_convert(None)
+        
+        written = 0
+        for snapshot_user_id, rows in expenses.groupby("user_id"):
+            path = snapshot_path(snapshot_user_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            rows.drop(columns="user_id").to_parquet(
+                tmp_path,
+                engine="pyarrow",
+                compression="snappy",
+                use_dictionary=True,
+                index=False
+            )
+            os.replace(tmp_path, path)
+            written += 1
+        
+        logger.info(f"Expense snapshots written: {written} users")
+        return written
+    
+    def monthly_totals_query(
+        self,
+        db: Session,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ):
+        """
+        Builds the query that aggregates expenses by user, year and month
+        
+        Args:
+            start_date: First date included (open if None)
+            end_date: Dates before this one are included (open if None)
+            user_id: Restrict to one user (all users if None)
+        """
+        year = extract('year', tables.Expense.date)
+        month = extract('month', tables.Expense.date)
+        
+        query = db.query(
+            tables.Expense.user_id,
+            year.label('year'),
+            month.label('month'),
+            func.sum(tables.Expense.amount).label('total'),
+            func.count(tables.Expense.id).label('count')
+        )
+        
+        if start_date:
+            query = query.filter(tables.Expense.date >= start_date)
+        if end_date:
+            query = query.filter(tables.Expense.date < end_date)
+        if user_id is not None:
+            query = query.filter(tables.Expense.user_id == user_id)
+        
+        return query.group_by(
+            tables.Expense.user_id, year, month
+        ).order_by(
+            year, month
+        )
+    
+    def refresh_monthly_summary(self, db: Session, user_id: Optional[int] = None) -> int:
+        """
+        Recomputes the monthly_summary table from the expenses
+        
+        Only closed months are stored; the current month is always
+        aggregated live by the API.
+        
+        Args:
+            user_id: Refresh a single user (all users if None)
+            
+        Returns:
+            Number of monthly rows written
+        """
+        current_month = datetime.now().replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        
+        rows = [
+            {
+                "user_id": row.user_id,
+                "year": int(row.year),
+                "month": int(row.month),
+                "total": float(row.total),
+                "count": row.count
+            }
+            for row in self.monthly_totals_query(
+                db, end_date=current_month, user_id=user_id
+            )
+        ]
+        
+        delete_query = db.query(tables.MonthlySummary)
+        if user_id is not None:
+            delete_query = delete_query.filter(tables.MonthlySummary.user_id == user_id)
+        delete_query.delete(synchronize_session=False)
+        
+        if rows:
+            db.bulk_insert_mappings(tables.MonthlySummary, rows)
+        db.commit()
+        
+        logger.info(f"Monthly summary refreshed: {len(rows)} rows")
+        return len(rows)
+    
+    def invalidate_monthly_summary(self, db: Session, user_id: int, since: datetime):
+        """
+        Drops a user's summary rows from the month of `since` onwards
+        
+        Call it in the same transaction as any write that adds, changes or
+        removes expenses dated `since`. Dropping every later month too
+        keeps the summary a contiguous prefix of closed months, so readers
+        can aggregate live everything after its last row.
+        
+        Args:
+            user_id: Owner of the changed expenses
+            since: Date of the earliest changed expense
+        """
+        db.query(tables.MonthlySummary).filter(
+            tables.MonthlySummary.user_id == user_id,
+            or_(
+                tables.MonthlySummary.year > since.year,
+                and_(
+                    tables.MonthlySummary.year == since.year,
+                    tables.MonthlySummary.month >= since.month
+                )
+            )
+        ).delete(synchronize_session=False)
+    
     def detect_anomalies(
         self,
         db: Session,
@@ -164,45 +395,64 @@ class AnalyticsService:
         if threshold is None:
             threshold = ANOMALY_THRESHOLDS["z_score"]
         
-        # Get all expenses
-        expenses = db.query(tables.Expense).filter(
-            tables.Expense.user_id == user_id
-        ).all()
+        amount = tables.Expense.amount
         
-        if len(expenses) < 10:
-            return []  # Insufficient data for reliable detection
+        # Per-row statistics over all of the user's expenses, computed by the
+        # database with window functions (population variance as
+        # E[x^2] - E[x]^2, which every backend can evaluate)
+        stats = db.query(
+            tables.Expense.id,
+            tables.Expense.date,
+            tables.Expense.merchant,
+            amount,
+            tables.Category.name.label("category"),
+            func.count(tables.Expense.id).over().label("n"),
+            func.avg(amount).over().label("mean"),
+            func.avg(amount * amount).over().label("mean_sq")
+        ).join(
+            tables.Category,
+            tables.Expense.category_id == tables.Category.id
+        ).filter(
+            tables.Expense.user_id == user_id
+        ).subquery()
         
-        # Extract amounts
-        amounts = [e.amount for e in expenses]
+        variance = stats.c.mean_sq - stats.c.mean * stats.c.mean
+        squared_deviation = (stats.c.amount - stats.c.mean) * (stats.c.amount - stats.c.mean)
         
-        # Calculate statistics
-        mean = np.mean(amounts)
-        std = np.std(amounts)
+        # |z| > threshold  <=>  (x - mean)^2 > threshold^2 * variance
+        rows = db.query(stats).filter(
+            stats.c.n >= 10,  # Insufficient data for reliable detection
+            variance > 0,
+            squared_deviation > threshold * threshold * variance
+        ).order_by(
+            squared_deviation.desc(), stats.c.id
+        ).limit(20).all()  # Top 20 anomalies
         
-        if std == 0:
+        if not rows:
             return []
         
-        # Detect anomalies
-        anomalies = []
-        for expense in expenses:
-            z_score = abs((expense.amount - mean) / std)
-            
-            if z_score > threshold:
-                anomalies.append({
-                    "expense_id": expense.id,
-                    "date": expense.date,
-                    "merchant": expense.merchant,
-                    "amount": expense.amount,
-                    "category": expense.category.name,
-                    "z_score": float(z_score),
-                    "deviation": expense.amount - mean
-                })
-        
-        # Sort by z_score descending
-        anomalies.sort(key=lambda x: x["z_score"], reverse=True)
+        # The window statistics are the same on every row: compute the
+        # deviations and z-scores of the selected rows in one pass
+        mean = rows[0].mean
+        std = np.sqrt(max(rows[0].mean_sq - mean * mean, 0.0))
+        amounts = np.fromiter((row.amount for row in rows), dtype=np.float64, count=len(rows))
+        deviations = amounts - mean
+        z_scores = np.abs(deviations) / std
         
-        return anomalies[:20]  # Return top 20 anomalies
+        return [
+            {
+                "expense_id": row.id,
+                "date": row.date,
+                "merchant": row.merchant,
+                "amount": row.amount,
+                "category": row.category,
+                "z_score": z_score,
+                "deviation": deviation
+            }
+            for row, z_score, deviation in zip(rows, z_scores.tolist(), deviations.tolist())
+        ]
     
+    @cached_per_user()
     def calculate_category_insights(
         self,
         db: Session,
@@ -214,17 +464,20 @@ class AnalyticsService:
         """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=period_days)
+        mid_date = end_date - timedelta(days=period_days // 2)
         
-        query = db.query(
-            tables.Category.id,
-            tables.Category.name,
-            tables.Category.icon,
-            func.sum(tables.Expense.amount).label("total"),
+        amount = tables.Expense.amount
+        
+        # Per-category aggregates over the period, including the spending in
+        # each half of it (conditional sums)
+        per_category = db.query(
+            tables.Expense.category_id,
+            func.sum(amount).label("total"),
             func.count(tables.Expense.id).label("count"),
-            func.avg(tables.Expense.amount).label("average"),
-            func.max(tables.Expense.amount).label("max_expense")
-        ).join(
-            tables.Expense
+            func.avg(amount).label("average"),
+            func.max(amount).label("max_expense"),
+            func.sum(case((tables.Expense.date < mid_date, amount), else_=0)).label("first_half"),
+            func.sum(case((tables.Expense.date >= mid_date, amount), else_=0)).label("second_half")
         ).filter(
             and_(
                 tables.Expense.user_id == user_id,
@@ -232,16 +485,41 @@ class AnalyticsService:
                 tables.Expense.date <= end_date
             )
         ).group_by(
-            tables.Category.id
+            tables.Expense.category_id
+        ).cte("per_category")
+        
+        first_half = per_category.c.first_half
+        second_half = per_category.c.second_half
+        change = (second_half - first_half) * 100.0 / first_half
+        
+        # Up/down when the second half moves more than 10% from the first
+        trend = case(
+            (first_half == 0, "new"),
+            (change > 10, "up"),
+            (change < -10, "down"),
+            else_="stable"
+        )
+        
+        rows = db.query(
+            tables.Category.id,
+            tables.Category.name,
+            tables.Category.icon,
+            per_category.c.total,
+            per_category.c.count,
+            per_category.c.average,
+            per_category.c.max_expense,
+            func.sum(per_category.c.total).over().label("total_spending"),
+            trend.label("trend")
+        ).join(
+            per_category,
+            per_category.c.category_id == tables.Category.id
         ).order_by(
-            func.sum(tables.Expense.amount).desc()
+            per_category.c.total.desc()
         ).all()
         
-        total_spending = sum([r.total for r in query])
-        
         insights = []
-        for row in query:
-            percentage = (row.total / total_spending * 100) if total_spending > 0 else 0
+        for row in rows:
+            percentage = (row.total / row.total_spending * 100) if row.total_spending > 0 else 0
             
             insights.append({
                 "category_id": row.id,
@@ -252,60 +530,15 @@ class AnalyticsService:
                 "average": float(row.average),
                 "max_expense": float(row.max_expense),
                 "percentage": percentage,
-                "trend": self._calculate_trend(db, user_id, row.id, period_days)
+                "trend": row.trend
             })
         
         return insights
-    
-    def _calculate_trend(
-        self,
-        db: Session,
-        user_id: int,
-        category_id: int,
-        period_days: int
-    ) -> str:
-        """
-        Calculates if the spending trend is increasing, decreasing, or stable
-        """
-        end_date = datetime.now()
-        mid_date = end_date - timedelta(days=period_days // 2)
-        start_date = end_date - timedelta(days=period_days)
-        
-        # First half of the period
-        first_half = db.query(
-            func.sum(tables.Expense.amount)
-        ).filter(
-            and_(
-                tables.Expense.user_id == user_id,
-                tables.Expense.category_id == category_id,
-                tables.Expense.date >= start_date,
-                tables.Expense.date < mid_date
-            )
-        ).scalar() or 0
-        
-        # Second half of the period
-        second_half = db.query(
-            func.sum(tables.Expense.amount)
-        ).filter(
-            and_(
-                tables.Expense.user_id == user_id,
-                tables.Expense.category_id == category_id,
-                tables.Expense.date >= mid_date,
-                tables.Expense.date <= end_date
-            )
-        ).scalar() or 0
-        
-        if first_half == 0:
-            return "new"
-        
-        change = ((second_half - first_half) / first_half) * 100
-        
-        if change > 10:
-            return "up"
-        elif change < -10:
-            return "down"
-        else:
-            return "stable"
+
+
+def snapshot_path(user_id: int) -> Path:
+    """Location of a user's Parquet expense snapshot"""
+    return Path(settings.snapshot_dir) / f"expenses_{user_id}.parquet"
 
 
 # Global instance
@@ -1,16 +1,13 @@
-import pickle
 import os
 from typing import Dict, Tuple, Optional, List
 import logging
-from pathlib import Path
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
 import numpy as np
 
 from backend.config.settings import settings
-from backend.config.constants import EXPENSE_CATEGORIES
+from backend.config.constants import EXPENSE_CATEGORIES, KEYWORD_AUTOMATON
+from backend.utils.model_io import dump_model, load_model
+from backend.ml.classifier.model import create_online_pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +35,7 @@ class ExpenseClassifier:
         
         if os.path.exists(model_path):
             try:
-                with open(model_path, 'rb') as f:
-                    self.model = pickle.load(f)
+                self.model = load_model(model_path)
                 logger.info(f"✅ Classification model loaded from {model_path}")
             except Exception as e:
                 logger.error(f"❌ Error loading model: {e}")
@@ -50,29 +46,18 @@ class ExpenseClassifier:
     
     def _create_default_model(self):
         """Creates a basic model using category keywords"""
-        # Create pipeline
-        self.model = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                max_features=500,
-                ngram_range=(1, 2),
-                lowercase=True
-            )),
-            ('clf', MultinomialNB())
-        ])
-        
-        # Basic training data using keywords
-        X_train = []
-        y_train = []
-        
-        for category, info in self.category_map.items():
-            keywords = info["keywords"]
-            # Create synthetic samples
-            for keyword in keywords:
-                X_train.append(keyword)
-                y_train.append(category)
-                # Variations
-                X_train.append(f"purchase at {keyword}")
-                y_train.append(category)
+        # Create pipeline (hashed features + SGD, updatable with partial_fit)
+        self.model = create_online_pipeline()
+        
+        # Basic training data using keywords: each keyword and a variation
+        samples = [
+            (text, category)
+            for category, info in self.category_map.items()
+            for keyword in info["keywords"]
+            for text in (keyword, f"purchase at {keyword}")
+        ]
+        X_train = [text for text, _ in samples]
+        y_train = [category for _, category in samples]
         
         # Train basic model
         if X_train:
@@ -97,7 +82,7 @@ class ExpenseClassifier:
             Tuple of (category, confidence)
         """
         # Combine all available information
-        combined_text = " ".join(filter(None, [text, merchant, description]))
+        combined_text = " ".join(filter(None, (text, merchant, description)))
         combined_text = combined_text.lower()
         
         # First attempt rule-based classification (more reliable for specific keywords)
@@ -108,9 +93,11 @@ class ExpenseClassifier:
         # If no high confidence from rules, use ML
         if self.model:
             try:
-                prediction = self.model.predict([combined_text])[0]
+                # One transform + inference; the prediction is the argmax
                 probabilities = self.model.predict_proba([combined_text])[0]
-                confidence = max(probabilities)
+                best = np.argmax(probabilities)
+                prediction = self.model.classes_[best]
+                confidence = probabilities[best]
                 
                 # If ML also has low confidence, default back to rules if they exist
                 if confidence < 0.5 and rule_based[1] > 0:
@@ -124,6 +111,53 @@ class ExpenseClassifier:
         # Fallback
         return rule_based if rule_based[1] > 0 else ("others", 0.3)
     
+    def classify_batch(self, rows: List[Dict]) -> List[Tuple[str, float]]:
+        """
+        Classifies several expenses at once
+        
+        Same decision rules as classify, but the texts the keyword rules
+        cannot settle go through the ML model in a single predict_proba call.
+        
+        Args:
+            rows: Dicts with 'text' and optional 'merchant' and 'description'
+            
+        Returns:
+            List of (category, confidence), in the order of rows
+        """
+        texts = [
+            " ".join(
+                filter(None, (row.get("text"), row.get("merchant"), row.get("description")))
+            ).lower()
+            for row in rows
+        ]
+        
+        rule_based = [self._classify_by_rules(text) for text in texts]
+        results = [rules if rules[1] > 0.8 else None for rules in rule_based]
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        if pending and self.model:
+            try:
+                probabilities = self.model.predict_proba([texts[i] for i in pending])
+                best = np.argmax(probabilities, axis=1)
+                
+                for i, row_best, row_probabilities in zip(pending, best, probabilities):
+                    confidence = row_probabilities[row_best]
+                    
+                    # If ML also has low confidence, default back to rules if they exist
+                    if confidence < 0.5 and rule_based[i][1] > 0:
+                        results[i] = rule_based[i]
+                    else:
+                        results[i] = (self.model.classes_[row_best], confidence)
+            except Exception as e:
+                logger.error(f"ML classification error: {e}")
+        
+        # Fallback
+        return [
+            result if result is not None
+            else (rules if rules[1] > 0 else ("others", 0.3))
+            for result, rules in zip(results, rule_based)
+        ]
+    
     def _classify_by_rules(self, text: str) -> Tuple[str, float]:
         """
         Rule and keyword based classification
@@ -135,21 +169,23 @@ class ExpenseClassifier:
             Tuple of (category, confidence)
         """
         text = text.lower()
+        stripped = text.strip()
+        
+        # Single pass over the text; each distinct keyword counts once
+        matched_keywords = {value for _, value in KEYWORD_AUTOMATON.iter(text)}
+        
+        scores = {}
+        for keyword, slugs in matched_keywords:
+            # Higher weight if the keyword is the full text
+            weight = 3 if keyword == stripped else 1
+            for slug in slugs:
+                scores[slug] = scores.get(slug, 0) + weight
+        
+        # Ties go to the first category in definition order
         best_category = None
         max_matches = 0
-        
-        for category, info in self.category_map.items():
-            matches = 0
-            keywords = info["keywords"]
-            
-            for keyword in keywords:
-                if keyword.lower() in text:
-                    # Higher weight if the keyword is the full text
-                    if keyword.lower() == text.strip():
-                        matches += 3
-                    else:
-                        matches += 1
-            
+        for category in self.category_map:
+            matches = scores.get(category, 0)
             if matches > max_matches:
                 max_matches = matches
                 best_category = category
@@ -188,8 +224,12 @@ class ExpenseClassifier:
         
         if len(X) >= 10:
             try:
-                # Re-train model
-                self.model.fit(X, y)
+                if self._supports_partial_fit():
+                    # Update the model with the new samples only
+                    self._partial_fit(X, y)
+                else:
+                    # Re-train model
+                    self.model.fit(X, y)
                 
                 # Save updated model
                 self.save_model()
@@ -198,16 +238,43 @@ class ExpenseClassifier:
             except Exception as e:
                 logger.error(f"Error re-training model: {e}")
     
+    def _supports_partial_fit(self) -> bool:
+        """Whether the model can be updated incrementally"""
+        steps = getattr(self.model, "named_steps", {})
+        return "vectorizer" in steps and hasattr(steps.get("clf"), "partial_fit")
+    
+    def _partial_fit(self, X: List[str], y: List[str]):
+        """
+        Updates the hashed-features model with new samples
+        
+        Args:
+            X: Texts
+            y: Category slugs (samples of unknown categories are skipped)
+        """
+        clf = self.model.named_steps["clf"]
+        classes = getattr(clf, "classes_", None)
+        if classes is None:
+            classes = np.array(list(self.category_map))
+        
+        known = set(classes)
+        samples = [(text, label) for text, label in zip(X, y) if label in known]
+        if not samples:
+            return
+        
+        # Memory-mapped (read-only) weights are copied before being updated
+        for attr in ("coef_", "intercept_"):
+            value = getattr(clf, attr, None)
+            if value is not None and not value.flags.writeable:
+                setattr(clf, attr, np.array(value))
+        
+        X_vec = self.model.named_steps["vectorizer"].transform([text for text, _ in samples])
+        clf.partial_fit(X_vec, [label for _, label in samples], classes=classes)
+    
     def save_model(self):
         """Saves the trained model"""
         try:
             model_path = settings.classifier_model_path
-            
-            # Create directory if it doesn't exist
-            Path(model_path).parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(model_path, 'wb') as f:
-                pickle.dump(self.model, f)
+            dump_model(self.model, model_path)
             
             logger.info(f"✅ Model saved at {model_path}")
         except Exception as e:
@@ -1,21 +1,108 @@
 import re
+import functools
 from datetime import datetime
 from typing import Dict, Optional, List
 import logging
+import ahocorasick
 from dateutil import parser as date_parser
 
-from backend.config.constants import OCR_PATTERNS
+from backend.config.constants import OCR_PATTERNS_COMPILED
 
 logger = logging.getLogger(__name__)
 
+# Fallback patterns, compiled once at import
+_GENERAL_DATE_RE = re.compile(r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b')  # DD/MM/YYYY or DD-MM-YYYY
+_CURRENCY_RE = re.compile(r'€?\s*(\d+[.,]\d{2})\s*€?')
+# Item + price lines, e.g. "WHOLE MILK              2.50"; [^\S\n] is
+# whitespace that does not cross into the next line
+_ITEM_RE = re.compile(
+    r'^[^\S\n]*(\S.*?)[^\S\n]+(\d+[.,]\d{2})[^\S\n]*€?[^\S\n]*$',
+    re.MULTILINE
+)
+_NON_UPPER_RE = re.compile(r'[^A-Z\s]')
+_NUMERIC_DATE_RE = re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})')
+
+# Payment method keywords, in priority order
+_PAYMENT_KEYWORDS = {
+    "cash": ["efectivo", "cash", "metalico"],
+    "card": ["tarjeta", "card", "visa", "mastercard"],
+    "debit_card": ["debito", "debit"],
+    "credit_card": ["credito", "credit"],
+    "bizum": ["bizum"],
+    "transfer": ["transferencia", "transfer"]
+}
+
+# One named group per method, so a single scan finds every method mentioned
+_PAYMENT_RE = re.compile("|".join(
+    f"(?P<{method}>{'|'.join(map(re.escape, keywords))})"
+    for method, keywords in _PAYMENT_KEYWORDS.items()
+))
+
+# Known merchant names, in priority order
+_KNOWN_MERCHANTS = [
+    'mercadona', 'carrefour', 'lidl', 'dia', 'alcampo',
+    'eroski', 'aldi', 'hipercor', 'el corte ingles',
+    'decathlon', 'media markt', 'fnac', 'ikea', 'zara',
+    'mcdonalds', 'burger king', 'telepizza', 'dominos'
+]
+
+
+def _build_merchant_automaton() -> ahocorasick.Automaton:
+    """
+    Builds an Aho-Corasick automaton over the known merchant names
+    
+    Each name maps to (priority, name), so the best match of a line is the
+    minimum over its hits.
+    """
+    automaton = ahocorasick.Automaton()
+    for priority, merchant in enumerate(_KNOWN_MERCHANTS):
+        automaton.add_word(merchant, (priority, merchant))
+    automaton.make_automaton()
+    
+    return automaton
+
+
+_MERCHANT_AUTOMATON = _build_merchant_automaton()
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date_string(date_str: str) -> Optional[datetime]:
+    """
+    Parses a date found in a receipt, day first
+    
+    Plain DD/MM/YYYY dates are built directly; anything else (two-digit
+    years, month names, swapped day and month) goes through dateutil.
+    Results are cached, since the same dates repeat across receipts.
+    
+    Args:
+        date_str: Matched date text
+        
+    Returns:
+        Date as datetime object or None if it cannot be parsed
+    """
+    match = _NUMERIC_DATE_RE.fullmatch(date_str)
+    if match:
+        day, month, year = map(int, match.groups())
+        # dateutil maps years below 100 into the current century
+        if year >= 100:
+            try:
+                return datetime(year, month, day)
+            except ValueError:
+                pass
+    
+    try:
+        return date_parser.parse(date_str, dayfirst=True)
+    except (ValueError, OverflowError):
+        return None
+
 
 class ReceiptParser:
     """Service for parsing receipt information"""
     
     def __init__(self):
-        self.date_patterns = OCR_PATTERNS["date"]
-        self.total_patterns = OCR_PATTERNS["total"]
-        self.merchant_patterns = OCR_PATTERNS["merchant"]
+        self.date_patterns = OCR_PATTERNS_COMPILED["date"]
+        self.total_patterns = OCR_PATTERNS_COMPILED["total"]
+        self.merchant_patterns = OCR_PATTERNS_COMPILED["merchant"]
     
     def parse_receipt(self, text: str) -> Dict[str, any]:
         """
@@ -27,52 +114,49 @@ class ReceiptParser:
         Returns:
             Dict with parsed information
         """
+        # Shared by the extractors, so the text is lowercased and split once
+        text_lower = text.lower()
+        lines = text.split('\n')
+        
         result = {
-            "date": self.extract_date(text),
-            "merchant": self.extract_merchant(text),
+            "date": self.extract_date(text, text_lower=text_lower),
+            "merchant": self.extract_merchant(text, lines=lines),
             "total": self.extract_total(text),
             "items": self.extract_items(text),
-            "payment_method": self.extract_payment_method(text),
+            "payment_method": self.extract_payment_method(text, text_lower=text_lower),
             "raw_text": text
         }
         
         return result
     
-    def extract_date(self, text: str) -> Optional[datetime]:
+    def extract_date(self, text: str, text_lower: Optional[str] = None) -> Optional[datetime]:
         """
         Extracts the date from the receipt
         
         Args:
             text: Receipt text
+            text_lower: Lowercased text, if already computed
             
         Returns:
             Date as datetime object or None
         """
         # Clean text
-        text = text.lower()
+        text = text.lower() if text_lower is None else text_lower
         
         # Try specific patterns
         for pattern in self.date_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
-                date_str = match.group(1)
-                try:
-                    # Attempt to parse the date
-                    date = date_parser.parse(date_str, dayfirst=True)
+                date = _parse_date_string(match.group(1))
+                if date:
                     return date
-                except:
-                    continue
         
         # Try searching for any date pattern
-        # Look for DD/MM/YYYY or DD-MM-YYYY
-        general_pattern = r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b'
-        match = re.search(general_pattern, text)
+        match = _GENERAL_DATE_RE.search(text)
         if match:
-            try:
-                date = date_parser.parse(match.group(1), dayfirst=True)
+            date = _parse_date_string(match.group(1))
+            if date:
                 return date
-            except:
-                pass
         
         logger.warning("Could not extract date from receipt")
         return None
@@ -91,7 +175,7 @@ class ReceiptParser:
         
         # Search for total patterns
         for pattern in self.total_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+            matches = pattern.finditer(text)
             for match in matches:
                 amount_str = match.group(1)
                 # Clean and convert
@@ -107,8 +191,7 @@ class ReceiptParser:
             return max(amounts)
         
         # Search for any number with currency format
-        currency_pattern = r'€?\s*(\d+[.,]\d{2})\s*€?'
-        matches = re.findall(currency_pattern, text)
+        matches = _CURRENCY_RE.findall(text)
         if matches:
             try:
                 # Convert all and return the highest
@@ -120,17 +203,19 @@ class ReceiptParser:
         logger.warning("Could not extract total amount from receipt")
         return None
     
-    def extract_merchant(self, text: str) -> Optional[str]:
+    def extract_merchant(self, text: str, lines: Optional[List[str]] = None) -> Optional[str]:
         """
         Extracts the merchant name
         
         Args:
             text: Receipt text
+            lines: Text split on newlines, if already computed
             
         Returns:
             Merchant name or None
         """
-        lines = text.split('\n')
+        if lines is None:
+            lines = text.split('\n')
         
         # Search in the first few lines (merchant name is usually at the top)
         for i, line in enumerate(lines[:5]):
@@ -139,22 +224,14 @@ class ReceiptParser:
             # Search for uppercase lines (common for merchant names)
             if len(line) > 3 and line.isupper():
                 # Clean special characters
-                cleaned = re.sub(r'[^A-Z\s]', '', line)
+                cleaned = _NON_UPPER_RE.sub('', line)
                 if len(cleaned) > 3:
                     return cleaned.strip()
             
-            # Search for known merchant names
-            known_merchants = [
-                'mercadona', 'carrefour', 'lidl', 'dia', 'alcampo',
-                'eroski', 'aldi', 'hipercor', 'el corte ingles',
-                'decathlon', 'media markt', 'fnac', 'ikea', 'zara',
-                'mcdonalds', 'burger king', 'telepizza', 'dominos'
-            ]
-            
-            line_lower = line.lower()
-            for merchant in known_merchants:
-                if merchant in line_lower:
-                    return merchant.upper()
+            # Search for known merchant names in a single pass over the line
+            hits = [value for _, value in _MERCHANT_AUTOMATON.iter(line.lower())]
+            if hits:
+                return min(hits)[1].upper()
         
         # If not found, use the first non-empty line
         for line in lines:
@@ -174,57 +251,35 @@ class ReceiptParser:
         Returns:
             List of items with description and price
         """
-        items = []
-        lines = text.split('\n')
-        
-        # Pattern for lines with item + price
-        # Example: "WHOLE MILK              2.50"
-        item_pattern = r'^(.+?)\s+(\d+[.,]\d{2})\s*€?$'
-        
-        for line in lines:
-            line = line.strip()
-            match = re.match(item_pattern, line)
-            
-            if match:
-                description = match.group(1).strip()
-                price_str = match.group(2).replace(',', '.')
-                
-                try:
-                    price = float(price_str)
-                    items.append({
-                        "description": description,
-                        "price": price
-                    })
-                except:
-                    continue
-        
-        return items
+        # One scan over the whole text; each match is a single line
+        return [
+            {
+                "description": match.group(1).strip(),
+                "price": float(match.group(2).replace(',', '.'))
+            }
+            for match in _ITEM_RE.finditer(text)
+        ]
     
-    def extract_payment_method(self, text: str) -> Optional[str]:
+    def extract_payment_method(self, text: str, text_lower: Optional[str] = None) -> Optional[str]:
         """
         Extracts the payment method
         
         Args:
             text: Receipt text
+            text_lower: Lowercased text, if already computed
             
         Returns:
             Payment method or None
         """
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         
-        payment_keywords = {
-            "cash": ["efectivo", "cash", "metalico"],
-            "card": ["tarjeta", "card", "visa", "mastercard"],
-            "debit_card": ["debito", "debit"],
-            "credit_card": ["credito", "credit"],
-            "bizum": ["bizum"],
-            "transfer": ["transferencia", "transfer"]
-        }
+        found = {match.lastgroup for match in _PAYMENT_RE.finditer(text_lower)}
         
-        for method, keywords in payment_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return method
+        # The highest priority method wins, wherever it appears in the text
+        for method in _PAYMENT_KEYWORDS:
+            if method in found:
+                return method
         
         return None
     
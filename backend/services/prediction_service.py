@@ -1,7 +1,6 @@
 """
 Prediction service for forecasting future expenses
 """
-import pickle
 import os
 from typing import Dict, List, Optional, Tuple
 import logging
@@ -14,10 +13,35 @@ from sklearn.linear_model import LinearRegression
 
 from backend.config.settings import settings
 from backend.config.constants import PREDICTION_CONFIG
+from backend.utils.numeric import _linreg_fit, _forecast, _r_squared
+from backend.utils.model_io import dump_model, load_model
 
 logger = logging.getLogger(__name__)
 
 
+def _monthly_totals(dates: np.ndarray, amounts: np.ndarray) -> Tuple[np.ndarray, np.datetime64]:
+    """
+    Sums expense amounts per calendar month
+    
+    Months between the first and last expense without any expenses
+    count as zero.
+    
+    Args:
+        dates: Expense dates (datetime64)
+        amounts: Expense amounts, aligned with dates
+        
+    Returns:
+        Tuple (monthly totals, first month as datetime64[M])
+    """
+    months = np.asarray(dates).astype('datetime64[M]')
+    first_month = months.min()
+    totals = np.bincount(
+        (months - first_month).astype(np.int64),
+        weights=np.asarray(amounts, dtype=np.float64)
+    )
+    return totals, first_month
+
+
 class PredictionService:
     """Service for predicting future expenses"""
     
@@ -30,8 +54,7 @@ class PredictionService:
         """Load existing model or create a new one"""
         if os.path.exists(self.model_path):
             try:
-                with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
+                self.model = load_model(self.model_path)
                 logger.info(f"✅ Prediction model loaded from {self.model_path}")
             except Exception as e:
                 logger.error(f"❌ Error loading prediction model: {e}")
@@ -62,43 +85,68 @@ class PredictionService:
         Returns:
             Dictionary with predictions and confidence intervals
         """
+        # Validate minimum data requirement
+        if len(expenses_data) < PREDICTION_CONFIG["min_data_points"]:
+            return {
+                "success": False,
+                "error": (
+                    "Insufficient data. Need at least "
+                    f"{PREDICTION_CONFIG['min_data_points']} records."
+                ),
+                "predictions": []
+            }
+        
         try:
-            # Validate minimum data requirement
-            if len(expenses_data) < PREDICTION_CONFIG["min_data_points"]:
-                return {
-                    "success": False,
-                    "error": f"Insufficient data. Need at least {PREDICTION_CONFIG['min_data_points']} records.",
-                    "predictions": []
-                }
-            
             # Filter by category if specified
             if category:
                 expenses_data = expenses_data[expenses_data['category'] == category]
             
-            # Prepare time series data
-            expenses_data['date'] = pd.to_datetime(expenses_data['date'])
-            expenses_data = expenses_data.sort_values('date')
+            dates = pd.to_datetime(expenses_data['date'], cache=True).to_numpy()
+            amounts = expenses_data['amount'].to_numpy(dtype=np.float64)
+        except Exception as e:
+            logger.error(f"Error in prediction: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "predictions": []
+            }
+        
+        return self.predict_future_expenses_arrays(dates, amounts, periods=periods)
+    
+    def predict_future_expenses_arrays(
+        self,
+        dates: np.ndarray,
+        amounts: np.ndarray,
+        periods: int = 3
+    ) -> Dict:
+        """
+        Predict future expenses from raw expense arrays
+        
+        Args:
+            dates: Expense dates (datetime64)
+            amounts: Expense amounts, aligned with dates
+            periods: Number of future periods to predict (months)
             
+        Returns:
+            Dictionary with predictions and confidence intervals
+        """
+        try:
             # Aggregate by month
-            monthly_data = expenses_data.groupby(
-                pd.Grouper(key='date', freq='M')
-            )['amount'].sum().reset_index()
+            y, first_month = _monthly_totals(dates, amounts)
             
             # Prepare features (months as numeric)
-            monthly_data['month_num'] = range(len(monthly_data))
-            X = monthly_data[['month_num']].values
-            y = monthly_data['amount'].values
+            x = np.arange(len(y), dtype=np.float64)
             
-            # Train simple linear regression
-            self.model.fit(X, y)
+            # Fit simple linear regression
+            slope, intercept = _linreg_fit(x, y)
+            fitted = _forecast(slope, intercept, len(y))
             
-            # Generate predictions
-            last_month = len(monthly_data)
-            future_months = np.array([[last_month + i] for i in range(1, periods + 1)])
-            predictions = self.model.predict(future_months)
+            # Generate predictions (months after the last observed one)
+            last_month = len(y)
+            predictions = _forecast(slope, intercept, last_month + periods + 1)[last_month + 1:]
             
             # Calculate confidence intervals (simple approach)
-            residuals = y - self.model.predict(X)
+            residuals = y - fitted
             std_error = np.std(residuals)
             confidence = PREDICTION_CONFIG["confidence_interval"]
             z_score = 1.96 if confidence == 0.95 else 2.576  # 95% or 99%
@@ -107,12 +155,11 @@ class PredictionService:
             
             # Format results
             results = []
-            base_date = monthly_data['date'].max()
+            base_month = first_month + (len(y) - 1)
             
             for i, pred in enumerate(predictions, 1):
-                future_date = base_date + pd.DateOffset(months=i)
                 results.append({
-                    "month": future_date.strftime("%Y-%m"),
+                    "month": str(base_month + i),  # YYYY-MM
                     "predicted_amount": float(max(0, pred)),  # Ensure non-negative
                     "lower_bound": float(max(0, pred - margin_of_error)),
                     "upper_bound": float(pred + margin_of_error),
@@ -124,8 +171,8 @@ class PredictionService:
                 "predictions": results,
                 "model_info": {
                     "type": "Linear Regression",
-                    "training_samples": len(monthly_data),
-                    "r_squared": self.model.score(X, y)
+                    "training_samples": len(y),
+                    "r_squared": float(_r_squared(y, fitted))
                 }
             }
             
@@ -153,15 +200,36 @@ class PredictionService:
             Dictionary with predictions per category
         """
         categories = expenses_data['category'].unique()
+        
+        if len(expenses_data) < PREDICTION_CONFIG["min_data_points"]:
+            return {
+                category: self.predict_future_expenses(
+                    expenses_data, periods=periods, category=category
+                )
+                for category in categories
+            }
+        
+        # Convert the columns once and slice them per category
+        try:
+            dates = pd.to_datetime(expenses_data['date'], cache=True).to_numpy()
+            amounts = expenses_data['amount'].to_numpy(dtype=np.float64)
+            category_values = expenses_data['category'].to_numpy()
+        except Exception as e:
+            logger.error(f"Error in prediction: {e}")
+            return {
+                category: {"success": False, "error": str(e), "predictions": []}
+                for category in categories
+            }
+        
         predictions_by_category = {}
         
         for category in categories:
-            category_pred = self.predict_future_expenses(
-                expenses_data,
-                periods=periods,
-                category=category
+            mask = category_values == category
+            predictions_by_category[category] = self.predict_future_expenses_arrays(
+                dates[mask],
+                amounts[mask],
+                periods=periods
             )
-            predictions_by_category[category] = category_pred
         
         return predictions_by_category
     
@@ -176,23 +244,38 @@ class PredictionService:
             Dictionary with trend information
         """
         try:
-            # Prepare monthly data
-            expenses_data['date'] = pd.to_datetime(expenses_data['date'])
-            monthly_data = expenses_data.groupby(
-                pd.Grouper(key='date', freq='M')
-            )['amount'].sum()
+            dates = pd.to_datetime(expenses_data['date']).to_numpy(dtype='datetime64[D]')
+            amounts = expenses_data['amount'].to_numpy(dtype=np.float64)
+        except Exception as e:
+            logger.error(f"Error detecting trend: {e}")
+            return {"trend": "error", "error": str(e)}
+        
+        return self.detect_trend_arrays(dates, amounts)
+    
+    def detect_trend_arrays(self, dates: np.ndarray, amounts: np.ndarray) -> Dict:
+        """
+        Detect spending trend from raw expense arrays
+        
+        Args:
+            dates: Expense dates (datetime64)
+            amounts: Expense amounts, aligned with dates
             
-            if len(monthly_data) < 2:
+        Returns:
+            Dictionary with trend information
+        """
+        try:
+            if len(dates) == 0:
                 return {"trend": "insufficient_data"}
             
-            # Calculate trend using linear regression
-            X = np.array(range(len(monthly_data))).reshape(-1, 1)
-            y = monthly_data.values
+            # Aggregate by calendar month; months without expenses count as zero
+            monthly_totals, _ = _monthly_totals(dates, amounts)
             
-            model = LinearRegression()
-            model.fit(X, y)
+            if len(monthly_totals) < 2:
+                return {"trend": "insufficient_data"}
             
-            slope = model.coef_[0]
+            # Calculate trend using linear regression
+            x = np.arange(len(monthly_totals), dtype=np.float64)
+            slope, _ = _linreg_fit(x, monthly_totals)
             
             # Determine trend
             if slope > 10:  # Increasing by more than $10/month
@@ -216,10 +299,7 @@ class PredictionService:
         """Save the trained model"""
         try:
             model_path = Path(self.model_path)
-            model_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(model_path, 'wb') as f:
-                pickle.dump(self.model, f)
+            dump_model(self.model, model_path)
             
             logger.info(f"✅ Prediction model saved to {model_path}")
         except Exception as e:
@@ -238,14 +318,11 @@ class PredictionService:
                 return
             
             # Prepare data
-            expenses_data['date'] = pd.to_datetime(expenses_data['date'])
-            monthly_data = expenses_data.groupby(
-                pd.Grouper(key='date', freq='M')
-            )['amount'].sum().reset_index()
-            
-            monthly_data['month_num'] = range(len(monthly_data))
-            X = monthly_data[['month_num']].values
-            y = monthly_data['amount'].values
+            y, _ = _monthly_totals(
+                pd.to_datetime(expenses_data['date'], cache=True).to_numpy(),
+                expenses_data['amount'].to_numpy(dtype=np.float64)
+            )
+            X = np.arange(len(y)).reshape(-1, 1)
             
             # Train model
             self.model.fit(X, y)
@@ -253,7 +330,7 @@ class PredictionService:
             # Save model
             self.save_model()
             
-            logger.info(f"✅ Model trained with {len(monthly_data)} months of data")
+            logger.info(f"✅ Model trained with {len(y)} months of data")
             
         except Exception as e:
             logger.error(f"Error training model: {e}")
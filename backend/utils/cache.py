@@ -0,0 +1,236 @@
+"""
+In-process TTL cache for read-heavy endpoints
+"""
+import functools
+import inspect
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.models import tables
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry expiration
+
+    Entries are grouped in namespaces so that all cached results of a
+    user can be invalidated at once when their data changes.
+    """
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[str, Dict[Hashable, Tuple[float, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Looks up a cached value
+
+        Args:
+            namespace: Cache namespace
+            key: Entry key inside the namespace
+
+        Returns:
+            Tuple (hit, value)
+        """
+        with self._lock:
+            entry = self._data.get(namespace, {}).get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[namespace][key]
+                return False, None
+            return True, value
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Stores a value in the cache"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            entries = self._data.setdefault(namespace, {})
+            if len(entries) >= self.maxsize:
+                # Drop the oldest entry to bound memory usage
+                entries.pop(next(iter(entries)))
+            entries[key] = (expires_at, value)
+
+    def clear(self, namespace: Optional[str] = None):
+        """
+        Invalidates cached entries
+
+        Args:
+            namespace: Namespace to clear; clears everything if None
+        """
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+            else:
+                self._data.pop(namespace, None)
+
+
+def analytics_namespace(user_id: int) -> str:
+    """Cache namespace holding a user's analytics results"""
+    return f"analytics:{user_id}"
+
+
+def user_analytics_namespace(kwargs: Dict[str, Any]) -> str:
+    """Namespace resolver for `cached` functions taking a `user_id` argument"""
+    return analytics_namespace(kwargs["user_id"])
+
+
+def cached(
+    namespace: Union[str, Callable[[Dict[str, Any]], str]],
+    ttl: Optional[float] = None,
+    exclude: Tuple[str, ...] = ("db",)
+):
+    """
+    Caches the result of an endpoint in the response cache
+
+    The key is built from the function name and its keyword arguments,
+    skipping the ones in `exclude` (e.g. the per-request DB session).
+    Works on both sync and async endpoints.
+
+    Args:
+        namespace: Cache namespace for the results, or a function that
+            resolves it from the call's keyword arguments (e.g.
+            user_analytics_namespace)
+        ttl: Time to live in seconds (defaults to the cache TTL)
+        exclude: Argument names left out of the key
+    """
+    def decorator(func: Callable) -> Callable:
+        def make_key(args, kwargs):
+            return (func.__qualname__, args) + tuple(
+                sorted((k, v) for k, v in kwargs.items() if k not in exclude)
+            )
+
+        def resolve_namespace(kwargs):
+            return namespace(kwargs) if callable(namespace) else namespace
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key_namespace = resolve_namespace(kwargs)
+                key = make_key(args, kwargs)
+                hit, value = response_cache.get(key_namespace, key)
+                if hit:
+                    return value
+                value = await func(*args, **kwargs)
+                response_cache.set(key_namespace, key, value, ttl)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key_namespace = resolve_namespace(kwargs)
+            key = make_key(args, kwargs)
+            hit, value = response_cache.get(key_namespace, key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            response_cache.set(key_namespace, key, value, ttl)
+            return value
+        return wrapper
+    return decorator
+
+
+def cached_per_user(ttl: Optional[float] = None, exclude: Tuple[str, ...] = ("self", "db")):
+    """
+    Caches the result of a service method in its user's analytics namespace
+
+    The method must take a `user_id` argument. The key is built from the
+    bound arguments (minus `exclude`) plus the current minute, so methods
+    that compute windows relative to now() never reuse a result across
+    minutes, and writes that clear the user's namespace drop it.
+
+    Args:
+        ttl: Time to live in seconds (defaults to the cache TTL)
+        exclude: Argument names left out of the key
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            namespace = analytics_namespace(bound.arguments["user_id"])
+            key = (
+                func.__qualname__,
+                datetime.now().replace(second=0, microsecond=0)
+            ) + tuple((k, v) for k, v in bound.arguments.items() if k not in exclude)
+
+            hit, value = response_cache.get(namespace, key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            response_cache.set(namespace, key, value, ttl)
+            return value
+        return wrapper
+    return decorator
+
+
+class CategoryRow(NamedTuple):
+    """Detached copy of a category row"""
+    id: int
+    name: str
+    slug: str
+    icon: Optional[str]
+
+
+class CategoryCache:
+    """
+    Process-local slug -> category lookup
+
+    Categories are a handful of static rows, so they are loaded once
+    (on startup or on first use) and served from memory afterwards.
+    """
+
+    def __init__(self):
+        self._by_slug: Dict[str, CategoryRow] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        """Reloads all categories from the database"""
+        rows = db.query(
+            tables.Category.id,
+            tables.Category.name,
+            tables.Category.slug,
+            tables.Category.icon
+        ).all()
+        by_slug = {row.slug: CategoryRow(*row) for row in rows}
+        with self._lock:
+            self._by_slug = by_slug
+
+    def get(self, db: Session, slug: str) -> Optional[CategoryRow]:
+        """
+        Looks up a category by slug
+
+        Args:
+            db: Database session, used only if the cache is still empty
+            slug: Category slug
+
+        Returns:
+            The category, or None if it does not exist
+        """
+        self.ensure_loaded(db)
+        return self._by_slug.get(slug)
+
+    def ensure_loaded(self, db: Session):
+        """Loads the categories if the cache is still empty"""
+        if not self._by_slug:
+            self.load(db)
+
+    def invalidate(self):
+        """Forgets the cached categories (call after mutating categories)"""
+        with self._lock:
+            self._by_slug = {}
+
+
+# Global instances
+response_cache = TTLCache(ttl=settings.cache_ttl)
+category_cache = CategoryCache()
@@ -2,38 +2,68 @@ import cv2
 import numpy as np
 from PIL import Image
 import logging
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# Longest side kept by preprocess_image; larger scans are downscaled first
+MAX_OCR_DIMENSION = 1500
 
-def preprocess_image(image_path: str, target_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+
+def _read_grayscale(image: Union[str, np.ndarray]) -> np.ndarray:
+    """
+    Loads an image as a single-channel grayscale array
+    
+    Args:
+        image: Path to the image, or an image array (grayscale, RGB or RGBA,
+            e.g. np.asarray of a PIL image)
+        
+    Returns:
+        Grayscale image as a numpy array
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    
+    # Read image
+    bgr = cv2.imread(image)
+    
+    if bgr is None:
+        raise ValueError(f"Could not read image: {image}")
+    
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+
+
+def preprocess_image(
+    image: Union[str, np.ndarray],
+    target_size: Optional[Tuple[int, int]] = None
+) -> np.ndarray:
     """
     Preprocesses an image to improve OCR quality
     
     Args:
-        image_path: Path to the image
-        target_size: Target size (width, height), optional
+        image: Path to the image, or an already decoded image array
+        target_size: Target size (width, height), optional; otherwise the
+            image is downscaled to at most MAX_OCR_DIMENSION pixels per side
         
     Returns:
         Processed image as a numpy array
     """
     try:
-        # Read image
-        image = cv2.imread(image_path)
-        
-        if image is None:
-            raise ValueError(f"Could not read image: {image_path}")
-        
         # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = _read_grayscale(image)
         
         # Resize if necessary
         if target_size:
             gray = cv2.resize(gray, target_size)
+        else:
+            gray = resize_if_too_large(gray, MAX_OCR_DIMENSION)
         
         # Apply bilateral filter to reduce noise while maintaining edges
-        denoised = cv2.bilateralFilter(gray, 9, 75, 75)
+        denoised = cv2.bilateralFilter(gray, 5, 50, 50)
         
         # Enhance contrast using CLAHE
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
@@ -58,8 +88,9 @@ def preprocess_image(image_path: str, target_size: Optional[Tuple[int, int]] = N
     except Exception as e:
         logger.error(f"Preprocessing error: {e}")
         # Return original image in grayscale if it fails
-        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        return image
+        if isinstance(image, np.ndarray):
+            return _read_grayscale(image)
+        return cv2.imread(image, cv2.IMREAD_GRAYSCALE)
 
 
 def rotate_image(image: np.ndarray, angle: float) -> np.ndarray:
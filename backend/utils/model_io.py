@@ -0,0 +1,45 @@
+"""
+Persistence helpers for trained models
+"""
+import os
+from pathlib import Path
+from typing import Any, Union
+
+import joblib
+
+
+def dump_model(model: Any, path: Union[str, Path]):
+    """
+    Saves a model with joblib, leaving its arrays uncompressed
+
+    The file is written next to the target and renamed over it, so
+    processes that still memory-map the previous version keep reading
+    valid data.
+
+    Args:
+        model: Model to save
+        path: Destination file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    joblib.dump(model, tmp_path, compress=0, protocol=5)
+    os.replace(tmp_path, path)
+
+
+def load_model(path: Union[str, Path]) -> Any:
+    """
+    Loads a model saved with dump_model
+
+    Large NumPy arrays are memory-mapped read-only, so every worker
+    process shares the same pages instead of holding its own copy.
+    Files written with plain pickle can also be loaded.
+
+    Args:
+        path: Model file
+
+    Returns:
+        The loaded model
+    """
+    return joblib.load(path, mmap_mode='r')
@@ -0,0 +1,129 @@
+"""
+Numeric kernels for the prediction endpoints
+
+The functions work on plain float64 NumPy arrays so they can be
+JIT-compiled with Numba when it is installed; otherwise they run as
+regular NumPy code.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - numba is optional
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+# Parallel loop over rows inside parallel kernels (plain range without Numba)
+prange = numba.prange if NUMBA_AVAILABLE else range
+
+
+def njit(func=None, *, parallel: bool = False):
+    """
+    Compile a kernel with Numba if available, else return it unchanged
+
+    Can be used bare (@njit) or with options (@njit(parallel=True)).
+    """
+    def decorator(f):
+        if not NUMBA_AVAILABLE:
+            return f
+        return numba.njit(cache=True, fastmath=True, parallel=parallel)(f)
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+@njit
+def _linreg_fit(x, y):
+    """
+    Ordinary least squares fit of y = slope * x + intercept
+
+    Args:
+        x: 1-D array of features
+        y: 1-D array of targets
+
+    Returns:
+        Tuple (slope, intercept)
+    """
+    x_mean = x.mean()
+    y_mean = y.mean()
+    dx = x - x_mean
+    denom = np.sum(dx * dx)
+    if denom == 0.0:
+        return 0.0, y_mean
+    slope = np.sum(dx * (y - y_mean)) / denom
+    return slope, y_mean - slope * x_mean
+
+
+@njit
+def _forecast(slope, intercept, n):
+    """Values of the fitted line for x = 0 .. n - 1"""
+    return slope * np.arange(n).astype(np.float64) + intercept
+
+
+@njit
+def _rmse(y, yhat):
+    """Root mean squared error"""
+    return np.sqrt(np.mean((y - yhat) ** 2))
+
+
+@njit
+def _r_squared(y, yhat):
+    """Coefficient of determination (same definition as sklearn's score)"""
+    ss_res = np.sum((y - yhat) ** 2)
+    ss_tot = np.sum((y - y.mean()) ** 2)
+    if ss_tot == 0.0:
+        return 1.0 if ss_res == 0.0 else 0.0
+    return 1.0 - ss_res / ss_tot
+
+
+@njit
+def _forecast_bounds(last_period, n_periods, slope, intercept, z, se_frac):
+    """
+    Forecast of the next n_periods with symmetric confidence bounds
+
+    Predictions are clamped at zero and the standard error is taken as a
+    fraction (se_frac) of each prediction.
+
+    Returns:
+        Tuple of arrays (predictions, lower bounds, upper bounds)
+    """
+    predictions = np.empty(n_periods)
+    lower = np.empty(n_periods)
+    upper = np.empty(n_periods)
+    for i in range(n_periods):
+        pred = max(slope * (last_period + i + 1) + intercept, 0.0)
+        margin = z * (pred * se_frac)
+        predictions[i] = pred
+        lower[i] = max(pred - margin, 0.0)
+        upper[i] = pred + margin
+    return predictions, lower, upper
+
+
+@njit(parallel=True)
+def _nb_predict(data, indices, indptr, log_prob_T, prior):
+    """
+    Naive Bayes class of each row of a CSR feature matrix
+
+    Fuses the sparse product X @ log_prob_T, the prior and the argmax in
+    one pass, without materializing the (n_rows x n_classes) scores.
+
+    Args:
+        data: CSR data array
+        indices: CSR column indices
+        indptr: CSR row pointers
+        log_prob_T: Feature log probabilities (n_features x n_classes)
+        prior: Per-class term added to every row's scores
+
+    Returns:
+        Array with the index of the predicted class for each row
+    """
+    n_rows = indptr.shape[0] - 1
+    out = np.empty(n_rows, dtype=np.int64)
+    for i in prange(n_rows):
+        scores = prior.copy()
+        for k in range(indptr[i], indptr[i + 1]):
+            scores += data[k] * log_prob_T[indices[k]]
+        out[i] = np.argmax(scores)
+    return out
@@ -0,0 +1,36 @@
+"""
+Script to refresh the precomputed monthly expense summary
+
+Intended to run nightly, e.g. from cron:
+    0 3 * * * cd /path/to/expense-ai-assistant && python scripts/refresh_monthly_summary.py
+"""
+import sys
+from pathlib import Path
+
+# Add root directory to path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from backend.models.database import SessionLocal
+from backend.services.analytics_service import analytics_service
+
+
+def main():
+    """Main execution function"""
+    print("🔄 Refreshing monthly summary...")
+    
+    db = SessionLocal()
+    
+    try:
+        rows = analytics_service.refresh_monthly_summary(db)
+        print(f"✅ {rows} monthly rows refreshed")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Script to write the per-user Parquet expense snapshots (requires pyarrow)
+
+Intended to run nightly, e.g. from cron:
+    30 3 * * * cd /path/to/expense-ai-assistant && python scripts/snapshot_expenses.py
+
+Monthly trends read the snapshots while they are younger than
+SNAPSHOT_MAX_AGE seconds.
+"""
+import sys
+from pathlib import Path
+
+# Add root directory to path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from backend.models.database import SessionLocal
+from backend.services.analytics_service import analytics_service
+
+
+def main():
+    """Main execution function"""
+    print("🔄 Writing expense snapshots...")
+    
+    db = SessionLocal()
+    
+    try:
+        files = analytics_service.write_expense_snapshots(db)
+        print(f"✅ {files} snapshots written")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
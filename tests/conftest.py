@@ -0,0 +1,20 @@
+"""
+Shared test fixtures
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add root directory to path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from backend.models.database import init_db
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_schema():
+    """Creates any missing tables, as the app does on startup"""
+    init_db()
+    yield
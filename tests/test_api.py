@@ -1,11 +1,17 @@
 """
 Tests for API endpoints
 """
+import asyncio
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 import sys
 from pathlib import Path
 from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Add root directory to path
 root_dir = Path(__file__).parent.parent
@@ -13,6 +19,8 @@ sys.path.append(str(root_dir))
 
 from backend.api.main import app
 from backend.models.database import get_db, Base, engine
+from backend.models import tables
+from backend.utils.cache import response_cache
 
 # Test client
 client = TestClient(app)
@@ -101,6 +109,12 @@ class TestExpenseEndpoints:
         response = client.get("/api/expenses/", params=params)
         assert response.status_code == 200
     
+    def test_get_expenses_with_skip(self):
+        """Test paging through expenses with an offset"""
+        response = client.get("/api/expenses/", params={"skip": 5, "limit": 10})
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+    
     def test_get_expense_not_found(self):
         """Test getting non-existent expense"""
         response = client.get("/api/expenses/99999")
@@ -173,6 +187,132 @@ class TestAnalyticsEndpoints:
         assert "average_expense" in data
 
 
+@pytest.fixture
+def seeded_db():
+    """
+    In-memory database with one user, one category and an expense in each
+    of the last three months; the monthly summary only covers the oldest
+    """
+    test_engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    event.listen(
+        test_engine, "connect",
+        lambda connection, _: connection.execute("PRAGMA foreign_keys=ON")
+    )
+    Base.metadata.create_all(bind=test_engine)
+    TestSession = sessionmaker(bind=test_engine, autoflush=False, expire_on_commit=False)
+    
+    current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    months = [current_month - relativedelta(months=n) for n in (3, 2, 1)]
+    
+    db = TestSession()
+    db.add(tables.User(id=1, email="test@example.com", name="Test", hashed_password="x"))
+    db.add(tables.Category(id=1, name="Food", slug="food"))
+    db.flush()
+    for month, amount in zip(months, (10.0, 20.0, 30.0)):
+        db.add(tables.Expense(
+            user_id=1, category_id=1, amount=amount, date=month.replace(day=15)
+        ))
+    db.add(tables.MonthlySummary(
+        user_id=1, year=months[0].year, month=months[0].month, total=10.0, count=1
+    ))
+    db.commit()
+    db.close()
+    
+    def override_get_db():
+        session = TestSession()
+        try:
+            yield session
+        finally:
+            session.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.clear()
+    yield months
+    app.dependency_overrides.pop(get_db, None)
+    response_cache.clear()
+
+
+class TestMonthlySummary:
+    """Test the precomputed monthly summary stays consistent with expenses"""
+    
+    @staticmethod
+    def _totals():
+        response = client.get("/api/analytics/monthly-comparison?months=6")
+        assert response.status_code == 200
+        return {(row["year"], row["month"]): row["total"] for row in response.json()}
+    
+    def test_months_after_stale_summary_are_aggregated_live(self, seeded_db):
+        """Test months newer than the last summary row are not dropped"""
+        totals = self._totals()
+        
+        for month, amount in zip(seeded_db, (10.0, 20.0, 30.0)):
+            assert totals[(month.year, month.month)] == amount
+    
+    def test_edit_in_summarized_month_is_reflected(self, seeded_db):
+        """Test editing an expense of a summarized month updates its total"""
+        expenses = client.get("/api/expenses/").json()
+        oldest = min(expenses, key=lambda expense: expense["date"])
+        
+        response = client.put(f"/api/expenses/{oldest['id']}", json={"amount": 15.0})
+        assert response.status_code == 200
+        
+        month = seeded_db[0]
+        assert self._totals()[(month.year, month.month)] == 15.0
+
+
+class TestExpenseReferences:
+    """Test errors for expenses pointing to missing rows"""
+    
+    @staticmethod
+    def _expense(category_id: int) -> dict:
+        return {
+            "date": datetime.now().isoformat(),
+            "merchant": "Test Store",
+            "category_id": category_id,
+            "amount": 50.0
+        }
+    
+    def test_create_expense_missing_category(self, seeded_db):
+        """Test an unknown category is reported as such"""
+        response = client.post("/api/expenses/", json=self._expense(99999))
+        assert response.status_code == 404
+        assert response.json()["message"] == "Category not found"
+    
+    def test_create_expense_missing_user(self, seeded_db):
+        """Test a missing user is not reported as a missing category"""
+        db = next(app.dependency_overrides[get_db]())
+        db.query(tables.MonthlySummary).delete()
+        db.query(tables.Expense).delete()
+        db.query(tables.User).delete()
+        db.commit()
+        
+        response = client.post("/api/expenses/", json=self._expense(1))
+        assert response.status_code == 404
+        assert response.json()["message"] == "User not found"
+
+
+class TestExpenseReads:
+    """Test read endpoints use the request database session"""
+    
+    def test_get_recent_expenses(self, seeded_db):
+        """Test recent expenses come from the overridden database"""
+        response = client.get("/api/expenses/recent/latest")
+        assert response.status_code == 200
+        assert [expense["amount"] for expense in response.json()] == [30.0, 20.0, 10.0]
+    
+    def test_get_expense(self, seeded_db):
+        """Test a single expense comes from the overridden database"""
+        expense_id = client.get("/api/expenses/recent/latest").json()[0]["id"]
+        
+        response = client.get(f"/api/expenses/{expense_id}")
+        assert response.status_code == 200
+        assert response.json()["amount"] == 30.0
+
+
 class TestUploadEndpoints:
     """Test upload endpoints"""
     
@@ -188,6 +328,47 @@ class TestUploadEndpoints:
             assert "category_id" in data[0]
             assert "category_name" in data[0]
             assert "confidence" in data[0]
+    
+    def test_batch_upload_bounds_concurrency(self, monkeypatch):
+        """Test batch upload processes at most UPLOAD_BATCH_CONCURRENCY receipts at once"""
+        from backend.api.routes import upload
+        
+        running = {"now": 0, "max": 0}
+        
+        async def fake_process_receipt(file, db):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            raise HTTPException(status_code=400, detail="unreadable")
+        
+        monkeypatch.setattr(upload, "_process_receipt", fake_process_receipt)
+        monkeypatch.setattr(upload.settings, "upload_batch_concurrency", 2)
+        
+        files = [("files", (f"r{i}.jpg", b"x", "image/jpeg")) for i in range(5)]
+        response = client.post("/api/upload/receipts/batch", files=files)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["message"] == "Processed 0 of 5 receipts"
+        assert not any(result["success"] for result in data["results"])
+        assert running["max"] == 2
+    
+    def test_manual_expense_keeps_raw_data(self, seeded_db):
+        """Test an expense confirmed from OCR stores the raw OCR data"""
+        response = client.post("/api/upload/manual-expense", json={
+            "text": "TOTAL 12.50",
+            "merchant": "Test Store",
+            "amount": 12.5,
+            "category_id": 1,
+            "confidence": 0.9,
+            "raw_data": {"items": ["coffee"]}
+        })
+        assert response.status_code == 200
+        
+        db = next(app.dependency_overrides[get_db]())
+        expense = db.get(tables.Expense, response.json()["expense_id"])
+        assert expense.extra_data == {"items": ["coffee"]}
 
 
 class TestErrorHandling:
@@ -108,6 +108,21 @@ class TestExpenseClassifier:
         # Confidence might be low
         assert 0 <= confidence <= 1
     
+    def test_classify_batch_matches_classify(self):
+        """Test batch classification gives the same results as classify"""
+        rows = [
+            {"text": "walmart"},
+            {"text": "Store", "merchant": "Whole Foods", "description": "Weekly groceries"},
+            {"text": "shell gasoline"},
+            {"text": "unknown merchant xyz123"},
+        ]
+        
+        results = expense_classifier.classify_batch(rows)
+        
+        assert len(results) == len(rows)
+        for row, result in zip(rows, results):
+            assert result == expense_classifier.classify(**row)
+    
     def test_category_map_structure(self):
         """Test category map has correct structure"""
         for slug, info in expense_classifier.category_map.items():
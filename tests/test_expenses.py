@@ -237,6 +237,65 @@ class TestTextProcessing:
         assert normalized == "WALMART"
 
 
+class TestSettings:
+    """Tests for environment-driven settings"""
+    
+    @pytest.mark.parametrize("value", [".jpg, .PNG", '["jpg", "png"]'])
+    def test_allowed_extensions_formats(self, monkeypatch, value):
+        """Test ALLOWED_EXTENSIONS accepts comma-separated and JSON lists"""
+        from backend.config.settings import Settings
+        
+        monkeypatch.setenv("ALLOWED_EXTENSIONS", value)
+        assert Settings().allowed_extensions == frozenset({"jpg", "png"})
+
+
+class TestResponseCache:
+    """Tests for the in-process response cache"""
+
+    def test_cache_hit_and_invalidation(self):
+        """Test cached results are reused until their namespace is cleared"""
+        from backend.utils.cache import TTLCache
+
+        cache = TTLCache(ttl=60)
+        cache.set("analytics:1", "summary", {"total": 10})
+        assert cache.get("analytics:1", "summary") == (True, {"total": 10})
+
+        cache.clear("analytics:1")
+        assert cache.get("analytics:1", "summary") == (False, None)
+
+    def test_cached_per_user_namespace(self):
+        """Test results are cached in, and invalidated with, the caller's namespace"""
+        from backend.utils.cache import (
+            analytics_namespace, cached, response_cache, user_analytics_namespace
+        )
+        
+        calls = []
+        
+        @cached(user_analytics_namespace)
+        def total(user_id):
+            calls.append(user_id)
+            return {"user": user_id}
+        
+        response_cache.clear()
+        assert total(user_id=1) == {"user": 1}
+        assert total(user_id=2) == {"user": 2}
+        assert total(user_id=2) == {"user": 2}
+        assert calls == [1, 2]
+        
+        response_cache.clear(analytics_namespace(2))
+        total(user_id=1)
+        total(user_id=2)
+        assert calls == [1, 2, 2]
+    
+    def test_cache_expiration(self):
+        """Test expired entries are not returned"""
+        from backend.utils.cache import TTLCache
+
+        cache = TTLCache(ttl=60)
+        cache.set("analytics:1", "summary", {"total": 10}, ttl=-1)
+        assert cache.get("analytics:1", "summary") == (False, None)
+
+
 # Execute tests
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
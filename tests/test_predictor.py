@@ -0,0 +1,35 @@
+"""
+Tests for the expense predictor model
+"""
+import pytest
+import sys
+from pathlib import Path
+import pandas as pd
+
+# Add root directory to path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from backend.ml.predictor.model import ExpensePredictorModel
+
+
+class TestExpensePredictorModel:
+    """Test expense predictor model functionality"""
+    
+    def test_prepare_data_keeps_cents_on_large_totals(self):
+        """Test large monthly totals are fitted without losing cents"""
+        df = pd.DataFrame({
+            "date": pd.date_range("2024-01-15", periods=6, freq="MS"),
+            "amount": [1234567.89 + 1000.37 * i for i in range(6)]
+        })
+        
+        model = ExpensePredictorModel()
+        X, y = model.prepare_data(df)
+        model.fit(X, y)
+        
+        assert y.tolist() == df["amount"].tolist()
+        assert model.predict(X) == pytest.approx(y, abs=0.001)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])